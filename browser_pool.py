@@ -0,0 +1,189 @@
+# browser_pool.py
+import os
+import queue
+import fcntl
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from webdriver_manager import WebDriverManager
+from utils import log
+
+
+class BrowserPool:
+    """
+    Keeps logged-in Chrome sessions warm so a crashed browser can be replaced
+    immediately instead of relaunching and logging in again.
+
+    Every browser runs in its own persistent profile under `profile_root`
+    (slot-0, slot-1, ...), so the HTTP cache and login survive between runs.
+    Slots are claimed with a file lock, which lets several processes share
+    one profile root.
+
+    Spares launch in the background. When none is ready within
+    `launch_timeout` seconds (e.g. because a background launch failed), a
+    browser is launched inline instead, so launch errors reach the caller.
+    """
+
+    def __init__(self, username, password, spares=1, headless=True, capture_network=False,
+                 profile_root="cache/chrome_profiles", light_pages=True, cookie_path="cache/session_cookies.bin",
+                 launch_timeout=180):
+        self.username = username
+        self.password = password
+        self.spares = spares
+        self.headless = headless
+        self.capture_network = capture_network
+        self.profile_root = profile_root
+        self.light_pages = light_pages
+        self.cookie_path = cookie_path
+        self.launch_timeout = launch_timeout
+        self._ready = queue.Queue()
+        self._locks = {}  # profile dir -> open lock file
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, spares))
+        self._closed = False
+
+    def _claim_profile(self):
+        """Lock the first profile slot not used by another browser."""
+        os.makedirs(self.profile_root, exist_ok=True)
+        with self._lock:
+            slot = 0
+            while True:
+                profile_dir = os.path.join(self.profile_root, f"slot-{slot}")
+                lock_file = open(f"{profile_dir}.lock", "w")
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    lock_file.close()
+                    slot += 1
+                    continue
+                self._locks[profile_dir] = lock_file
+                return profile_dir
+
+    def _release_profile(self, profile_dir):
+        with self._lock:
+            lock_file = self._locks.pop(profile_dir, None)
+        if lock_file:
+            lock_file.close()
+
+    def _new_manager(self, profile_dir):
+        return WebDriverManager(
+            self.username, self.password, headless=self.headless, capture_network=self.capture_network,
+            cookie_path=self.cookie_path, user_data_dir=profile_dir, light_pages=self.light_pages, pool=self,
+        )
+
+    def _start_browser(self, profile_dir=None):
+        """Start and log in one browser and return its manager; raises if the launch fails."""
+        profile_dir = profile_dir or self._claim_profile()
+        manager = self._new_manager(profile_dir)
+        try:
+            manager.initialize_driver()
+        except Exception as e:
+            log(f"Failed to launch browser in {profile_dir}: {str(e)}")
+            try:
+                manager.close()
+            except Exception:
+                pass
+            self._release_profile(profile_dir)
+            raise
+        return manager
+
+    def _launch(self, profile_dir=None):
+        """
+        Background task: start a spare and add it to the ready queue. If the
+        given profile cannot be reused (e.g. a crashed Chrome still holds it),
+        a fresh slot is tried. Failures are logged; acquire() and swap() fall
+        back to an inline launch when no spare turns up.
+        """
+        try:
+            manager = self._start_browser(profile_dir)
+        except Exception:
+            if profile_dir is None:
+                return
+            try:
+                manager = self._start_browser()
+            except Exception:
+                return
+        if self._closed:
+            self.release(manager)
+            return
+        self._ready.put(manager)
+
+    def _take_ready(self, timeout):
+        """Return a warm manager, or launch one inline if none is ready within `timeout` seconds."""
+        try:
+            return self._ready.get(timeout=timeout) if timeout else self._ready.get_nowait()
+        except queue.Empty:
+            if self.spares:
+                log(f"No warm browser ready after {timeout}s; launching one inline...")
+            return self._start_browser()
+
+    def start(self):
+        """Launch the spare browsers in the background."""
+        for _ in range(self.spares):
+            self._executor.submit(self._launch)
+        return self
+
+    def acquire(self, timeout=None):
+        """
+        Hand out a ready WebDriverManager whose restart_driver swaps in a spare
+        from this pool. Launches a browser inline if none is ready in time.
+        """
+        manager = self._take_ready(self.launch_timeout if timeout is None else timeout) if self.spares \
+            else self._start_browser()
+        if self.spares:
+            # Keep the pool topped up
+            self._executor.submit(self._launch)
+        return manager
+
+    def swap(self, driver, profile_dir, timeout=None):
+        """
+        Replace a crashed browser with a warm one. The old browser is quit and
+        its profile relaunched as a new spare in the background.
+
+        Returns:
+            tuple: (new driver, its profile directory).
+        """
+        if not self.spares:
+            # Nothing kept warm: relaunch in place, raising if that fails
+            self._quit(driver)
+            self._release_profile(profile_dir)
+            spare = self._start_browser()
+        else:
+            spare = self._take_ready(self.launch_timeout if timeout is None else timeout)
+            self._executor.submit(self._recycle, driver, profile_dir)
+        return spare.driver, spare.user_data_dir
+
+    @staticmethod
+    def _quit(driver):
+        try:
+            if driver:
+                driver.quit()
+        except Exception as e:
+            log(f"Error closing crashed browser: {str(e)}")
+
+    def _recycle(self, driver, profile_dir):
+        self._quit(driver)
+        self._launch(profile_dir if profile_dir in self._locks else None)
+
+    def release(self, manager):
+        """Quit a browser handed out by acquire() and free its profile slot."""
+        try:
+            manager.close()
+        except Exception as e:
+            log(f"Error closing browser: {str(e)}")
+        self._release_profile(manager.user_data_dir)
+
+    def close(self):
+        """Stop launching browsers and quit every spare."""
+        self._closed = True
+        self._executor.shutdown(wait=True)
+        while True:
+            try:
+                manager = self._ready.get_nowait()
+            except queue.Empty:
+                break
+            self.release(manager)
+        with self._lock:
+            lock_files = list(self._locks.values())
+            self._locks.clear()
+        for lock_file in lock_files:
+            lock_file.close()
@@ -0,0 +1,71 @@
+# cookie_store.py
+import os
+import json
+import base64
+import hashlib
+import tempfile
+from cryptography.fernet import Fernet, InvalidToken
+from utils import log
+
+SALT_BYTES = 16
+KDF_ITERATIONS = 200_000
+
+
+class CookieStore:
+    """
+    Encrypted on-disk store for browser session cookies.
+
+    The file holds a random salt followed by a Fernet token. The key is derived
+    from `secret` (the COOKIE_ENCRYPTION_KEY environment variable if set,
+    otherwise the account password) with PBKDF2-HMAC-SHA256.
+    """
+
+    def __init__(self, path, secret):
+        self.path = path
+        self.secret = os.getenv("COOKIE_ENCRYPTION_KEY") or secret
+        if not self.secret:
+            raise ValueError("A secret is required to encrypt stored cookies")
+
+    def _fernet(self, salt):
+        key = hashlib.pbkdf2_hmac("sha256", self.secret.encode("utf-8"), salt, KDF_ITERATIONS)
+        return Fernet(base64.urlsafe_b64encode(key))
+
+    def load(self):
+        """Return the stored cookie list, or None if missing or unreadable."""
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+            salt, token = data[:SALT_BYTES], data[SALT_BYTES:]
+            return json.loads(self._fernet(salt).decrypt(token))
+        except (InvalidToken, ValueError) as e:
+            log(f"Ignoring unreadable cookie file {self.path}: {str(e) or type(e).__name__}")
+            return None
+
+    def save(self, cookies):
+        """
+        Encrypt and write the cookie list, readable only by the current user.
+        Each call writes its own temp file (mkstemp creates it with mode 0600),
+        so concurrent workers never share one; the last replace wins.
+        """
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        salt = os.urandom(SALT_BYTES)
+        token = self._fernet(salt).encrypt(json.dumps(cookies).encode("utf-8"))
+        fd, tmp_path = tempfile.mkstemp(dir=directory or None, prefix=f"{os.path.basename(self.path)}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(salt + token)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass  # Already cleared by another worker
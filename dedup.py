@@ -0,0 +1,108 @@
+# dedup.py
+import re
+import hashlib
+import numpy as np
+import pandas as pd
+from utils import log, tweet_id_from_url
+
+SIMHASH_BITS = 64
+_URL_RE = re.compile(r"https?://\S+|www\.\S+")
+_WORD_RE = re.compile(r"\w+")
+
+
+def drop_duplicate_tweets(df):
+    """
+    Keep one row per tweet ID (parsed from `tweet_url`), preferring the
+    original over reposts. Rows without a parseable ID are kept.
+    """
+    ids = df["tweet_url"].map(tweet_id_from_url)
+    reposted = df["is_reposted"].fillna(False).astype(bool)
+    order = pd.DataFrame({"id": ids, "reposted": reposted}).sort_values("reposted", kind="stable")
+    duplicated = order["id"].duplicated() & order["id"].notna()
+    return df.loc[order.index[~duplicated.to_numpy()]].sort_index()
+
+
+def _words(text):
+    return _WORD_RE.findall(_URL_RE.sub(" ", text.lower()))
+
+
+def simhash(text, ngram=3):
+    """64-bit SimHash of a text's word n-gram shingles, ignoring URLs and case."""
+    words = _words(text)
+    shingles = [" ".join(words[i:i + ngram]) for i in range(max(1, len(words) - ngram + 1))]
+    hashes = np.array(
+        [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little") for s in shingles],
+        dtype=np.uint64,
+    )
+    bits = np.unpackbits(hashes.view(np.uint8)).reshape(-1, SIMHASH_BITS)
+    signature = np.packbits(bits.sum(axis=0) * 2 > len(shingles))
+    return int(signature.view(np.uint64)[0])
+
+
+def near_duplicate_groups(hashes, max_distance=3):
+    """
+    Label SimHashes so hashes within `max_distance` bits share a label.
+
+    Splits each hash into max_distance + 1 bands; by the pigeonhole principle
+    near-duplicates agree on at least one band, so only hashes sharing a band
+    are compared.
+    """
+    bands = max_distance + 1
+    width = SIMHASH_BITS // bands
+    mask = (1 << width) - 1
+    parent = list(range(len(hashes)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for band in range(bands):
+        buckets = {}
+        for i, value in enumerate(hashes):
+            buckets.setdefault((value >> (band * width)) & mask, []).append(i)
+        for members in buckets.values():
+            for a in range(len(members)):
+                for b in range(a + 1, len(members)):
+                    i, j = members[a], members[b]
+                    if find(i) != find(j) and (hashes[i] ^ hashes[j]).bit_count() <= max_distance:
+                        parent[find(j)] = find(i)
+    return [find(i) for i in range(len(hashes))]
+
+
+def collapse_near_duplicates(df, max_distance=3, min_words=8):
+    """
+    Collapse tweets whose text is a near copy of another (SimHash within
+    `max_distance` bits), such as an announcement pasted by many accounts.
+    Keeps the earliest original of each group and counts the rest in a
+    `duplicate_count` column. Texts shorter than `min_words` are left alone.
+    """
+    df = df.copy()
+    df["duplicate_count"] = 0
+    candidates = df[df["text"].fillna("").map(lambda t: len(_words(t)) >= min_words)]
+    if len(candidates) < 2:
+        return df
+
+    hashes = [simhash(text) for text in candidates["text"]]
+    groups = pd.Series(near_duplicate_groups(hashes, max_distance), index=candidates.index)
+    ranked = candidates.assign(
+        _group=groups,
+        _reposted=candidates["is_reposted"].fillna(False).astype(bool),
+    ).sort_values(["_group", "_reposted", "date", "time"], kind="stable")
+    keep = ranked.drop_duplicates("_group")
+    sizes = ranked.groupby("_group").size()
+    df.loc[keep.index, "duplicate_count"] = sizes.loc[keep["_group"]].to_numpy() - 1
+    return df.drop(index=ranked.index.difference(keep.index))
+
+
+def deduplicate(df, max_distance=3, min_words=8):
+    """Drop repeated tweet IDs, then collapse near-duplicate texts."""
+    if df.empty:
+        return df
+    before = len(df)
+    df = drop_duplicate_tweets(df)
+    by_id = before - len(df)
+    df = collapse_near_duplicates(df, max_distance, min_words)
+    log(f"Deduplication removed {by_id} repeated tweets and {before - by_id - len(df)} near-duplicates.")
+    return df
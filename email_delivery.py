@@ -0,0 +1,265 @@
+# email_delivery.py
+import os
+import json
+import time
+import random
+import asyncio
+import logging
+import smtplib
+from email_sender import (
+    SMTPConnection, render_newsletter, unsubscribe_token, is_connection_error, _load_credentials, SMTP_HOST, SMTP_PORT,
+)
+
+# Conservative sustained send rates (messages per second) per SMTP host
+PROVIDER_SEND_RATES = {
+    "smtp.gmail.com": 1.0,
+    "smtp.office365.com": 0.5,
+    "email-smtp.us-east-1.amazonaws.com": 14.0,
+    "smtp.sendgrid.net": 50.0,
+}
+DEFAULT_SEND_RATE = 5.0
+DAY_SECONDS = 24 * 60 * 60
+
+
+def is_transient_error(error):
+    """True for failures worth retrying: 4xx SMTP replies, dropped connections and network errors."""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    return is_connection_error(error)
+
+
+def is_fatal_error(error):
+    """
+    True for failures that would hit every recipient alike, such as rejected
+    credentials, a refused sender address or a server without STARTTLS/AUTH.
+    These abort the delivery instead of being charged to a subscriber.
+    """
+    return isinstance(error, (
+        smtplib.SMTPAuthenticationError,
+        smtplib.SMTPSenderRefused,
+        smtplib.SMTPHeloError,
+        smtplib.SMTPNotSupportedError,
+    ))
+
+
+def is_bounce(error, subscriber):
+    """True only if the server permanently (5xx) refused this subscriber's address."""
+    if not isinstance(error, smtplib.SMTPRecipientsRefused):
+        return False
+    refusal = error.recipients.get(subscriber)
+    if refusal is None and len(error.recipients) == 1:
+        refusal = next(iter(error.recipients.values()))  # Server echoed the address in another case
+    return refusal is not None and 500 <= refusal[0] < 600
+
+
+class DeliveryAborted(Exception):
+    """Raised by deliver() after a fatal error stopped the run; `report` covers what was sent."""
+
+    def __init__(self, message, report):
+        super().__init__(message)
+        self.report = report
+
+
+class AsyncRateLimiter:
+    """Token bucket that spaces sends to at most `rate` per second."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class RetryQueue:
+    """
+    Durable queue of recipients whose delivery failed transiently, stored as JSON
+    so the next run retries them before the regular subscriber list. An entry
+    is given up after `max_attempts` deferred runs or `max_age` seconds in the
+    queue.
+    """
+
+    def __init__(self, path="cache/email_retry_queue.json", max_attempts=5, max_age=7 * DAY_SECONDS):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.max_age = max_age
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+
+    def due(self):
+        """Return the queued subscribers to retry, dropping entries past the attempt or age limit."""
+        now = time.time()
+        for subscriber, entry in list(self.entries.items()):
+            if entry.get("attempts", 0) >= self.max_attempts or now - entry.get("queued_at", now) > self.max_age:
+                logging.warning(
+                    f"Giving up on {subscriber} after {entry.get('attempts', 0)} deferred runs: {entry.get('last_error')}"
+                )
+                self.remove(subscriber)
+        return list(self.entries)
+
+    def add(self, subscriber, error):
+        entry = self.entries.setdefault(subscriber, {"attempts": 0, "queued_at": time.time()})
+        entry["attempts"] += 1
+        entry["last_error"] = error
+        entry["last_attempt_at"] = time.time()
+
+    def remove(self, subscriber):
+        self.entries.pop(subscriber, None)
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+class DeliveryReport:
+    """Outcome of one delivery run."""
+
+    def __init__(self):
+        self.sent = []
+        self.bounced = {}   # Addresses permanently refused by the server: subscriber -> error
+        self.failed = {}    # Other permanent failures, e.g. rejected content: subscriber -> error
+        self.deferred = {}  # Transient failures left in the retry queue: subscriber -> error
+        self.aborted = None  # Error that stopped the whole run, if any
+        self.started_at = time.monotonic()
+        self.elapsed = 0.0
+
+    def summary(self):
+        summary = (
+            f"{len(self.sent)} sent, {len(self.bounced)} bounced, {len(self.failed)} failed, "
+            f"{len(self.deferred)} deferred for retry in {self.elapsed:.1f}s"
+        )
+        return f"{summary} (aborted: {self.aborted})" if self.aborted else summary
+
+
+async def deliver(newsletter, subscribers, connection_factory, concurrency=4, rate=DEFAULT_SEND_RATE,
+                  max_attempts=3, base_delay=2.0, retry_queue=None, is_subscribed=None):
+    """
+    Fan a rendered newsletter out to `subscribers` (any iterable, consumed lazily)
+    with `concurrency` workers, each holding its own SMTP connection.
+
+    Transient failures are retried with exponential backoff up to `max_attempts`
+    times, then persisted to `retry_queue`. Queued recipients for whom
+    `is_subscribed(email)` is false (e.g. unsubscribed or bounced since they
+    were queued) are dropped instead of retried. Returns a DeliveryReport.
+
+    A fatal error (see is_fatal_error) stops every worker and raises
+    DeliveryAborted once the retry queue is saved.
+    """
+    report = DeliveryReport()
+    limiter = AsyncRateLimiter(rate)
+    queue = asyncio.Queue(maxsize=concurrency * 4)
+    aborted = asyncio.Event()
+
+    async def produce():
+        # Retry queued recipients first; only they need de-duplicating against the stream
+        pending = set(retry_queue.due()) if retry_queue is not None else set()
+        for subscriber in list(pending):
+            if is_subscribed is not None and not is_subscribed(subscriber):
+                logging.info(f"Dropping {subscriber} from the retry queue: no longer subscribed")
+                retry_queue.remove(subscriber)
+                pending.discard(subscriber)
+                continue
+            await queue.put(subscriber)
+        for subscriber in subscribers:
+            if aborted.is_set():
+                break
+            if subscriber not in pending:
+                await queue.put(subscriber)
+        for _ in range(concurrency):
+            await queue.put(None)
+
+    async def send_with_retries(connection, subscriber):
+        data = newsletter.message_for(subscriber, unsubscribe_token(subscriber))
+        for attempt in range(1, max_attempts + 1):
+            await limiter.acquire()
+            if aborted.is_set():
+                return
+            try:
+                await asyncio.to_thread(connection.send, subscriber, data)
+                report.sent.append(subscriber)
+                if retry_queue is not None:
+                    retry_queue.remove(subscriber)
+                return
+            except Exception as e:
+                if is_fatal_error(e):
+                    logging.error(f"Aborting delivery: {e}")
+                    report.aborted = report.aborted or str(e)
+                    aborted.set()
+                    return
+                if not is_transient_error(e):
+                    if is_bounce(e, subscriber):
+                        logging.error(f"{subscriber} bounced: {e}")
+                        report.bounced[subscriber] = str(e)
+                    else:
+                        logging.error(f"Permanent failure sending to {subscriber}: {e}")
+                        report.failed[subscriber] = str(e)
+                    if retry_queue is not None:
+                        retry_queue.remove(subscriber)
+                    return
+                if attempt == max_attempts:
+                    logging.warning(f"Deferring {subscriber} after {attempt} attempts: {e}")
+                    report.deferred[subscriber] = str(e)
+                    if retry_queue is not None:
+                        retry_queue.add(subscriber, str(e))
+                    return
+                delay = base_delay * 2 ** (attempt - 1) * random.uniform(0.5, 1.0)
+                logging.info(f"Transient failure sending to {subscriber} ({e}); retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    async def work():
+        connection = connection_factory()
+        try:
+            while True:
+                subscriber = await queue.get()
+                if subscriber is None:
+                    return
+                if not aborted.is_set():  # After an abort, drain the queue so the producer can finish
+                    await send_with_retries(connection, subscriber)
+        finally:
+            await asyncio.to_thread(connection.close)
+
+    await asyncio.gather(produce(), *(work() for _ in range(concurrency)))
+    if retry_queue is not None:
+        retry_queue.save()
+    report.elapsed = time.monotonic() - report.started_at
+    logging.info(f"Delivery finished: {report.summary()}")
+    if report.aborted:
+        raise DeliveryAborted(report.aborted, report)
+    return report
+
+
+def deliver_newsletter(summaries, subscribers, concurrency=4, rate=None, host=SMTP_HOST, port=SMTP_PORT,
+                       retry_queue_path="cache/email_retry_queue.json", **kwargs):
+    """
+    Render the newsletter once and deliver it to every subscriber in parallel.
+    The send rate defaults to the known limit of the SMTP provider. Pass
+    `is_subscribed` (e.g. SubscriberRepository.is_active) so queued retries
+    respect unsubscribes and bounces.
+    """
+    EMAIL_SENDER, EMAIL_PASSWORD = _load_credentials()
+    newsletter = render_newsletter(summaries, EMAIL_SENDER)
+    rate = rate or PROVIDER_SEND_RATES.get(host, DEFAULT_SEND_RATE)
+    return asyncio.run(deliver(
+        newsletter,
+        subscribers,
+        lambda: SMTPConnection(EMAIL_SENDER, EMAIL_PASSWORD, host=host, port=port),
+        concurrency=concurrency,
+        rate=rate,
+        retry_queue=RetryQueue(retry_queue_path),
+        **kwargs,
+    ))
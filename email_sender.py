@@ -1,11 +1,15 @@
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 import smtplib
+import email.policy
+import hmac
+import hashlib
 import logging
 import markdown
 from datetime import datetime
 import re
 import os
+from urllib.parse import quote
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -14,30 +18,137 @@ load_dotenv()
 # Configure logging for this module
 logging.basicConfig(level=logging.INFO, format="[%(asctime)s] %(levelname)s: %(message)s")
 
-def send_email(summaries, subscriber):
-    """
-    Send an email with a single summary to a subscriber.
-    
-    Args:
-        summaries (dict): Dictionary with one key-summary pair, where summary contains the title.
-        subscriber (str): Email address of the subscriber.
-    """
-    # Load email credentials from environment variables
+SMTP_HOST = "smtp.gmail.com"
+SMTP_PORT = 587
+
+
+def _load_credentials():
+    """Load email credentials from environment variables."""
     EMAIL_SENDER = os.getenv("EMAIL_SENDER")
     EMAIL_PASSWORD = os.getenv("EMAIL_PASSWORD")
 
     if not EMAIL_SENDER or not EMAIL_PASSWORD:
         raise ValueError("EMAIL_SENDER and EMAIL_PASSWORD must be set in environment variables")
+    return EMAIL_SENDER, EMAIL_PASSWORD
+
+
+def is_connection_error(error):
+    """
+    True if `error` means the SMTP session itself is gone: a server disconnect
+    or a socket-level failure. smtplib.SMTPException subclasses OSError, so
+    server replies such as recipient or data rejections are excluded.
+    """
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return True
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+
+class SMTPConnection:
+    """
+    A reusable, authenticated SMTP connection. Messages are sent over the same
+    session; a dropped connection is reopened transparently and the message
+    retried once. The session is also recycled after `max_messages` sends,
+    since providers cap messages per connection.
+    """
+
+    def __init__(self, username=None, password=None, host=SMTP_HOST, port=SMTP_PORT,
+                 use_tls=True, timeout=30, max_messages=90, sender=None):
+        self.username = username
+        self.sender = sender or username
+        self.password = password
+        self.host = host
+        self.port = port
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self.max_messages = max_messages
+        self.server = None
+        self.sent_on_connection = 0
+
+    def connect(self):
+        self.close()
+        self.server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.use_tls:
+            self.server.starttls()
+        if self.username:
+            self.server.login(self.username, self.password)
+        self.sent_on_connection = 0
+        logging.info(f"Opened SMTP connection to {self.host}:{self.port}")
+
+    def send(self, recipient, data):
+        """Send a raw message, reconnecting once if the server dropped the session."""
+        if self.server is None or self.sent_on_connection >= self.max_messages:
+            self.connect()
+        try:
+            self.server.sendmail(self.sender, [recipient], data)
+        except OSError as e:
+            # Rejections by the server leave the session usable; never resend those
+            if not is_connection_error(e):
+                raise
+            logging.warning(f"SMTP connection lost ({e}); reconnecting...")
+            self.connect()
+            self.server.sendmail(self.sender, [recipient], data)
+        self.sent_on_connection += 1
+
+    def close(self):
+        if self.server is not None:
+            try:
+                self.server.quit()
+            except (smtplib.SMTPException, OSError):
+                self.server.close()
+            self.server = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def unsubscribe_token(subscriber, secret=None):
+    """Return a stable HMAC token identifying a subscriber in unsubscribe requests."""
+    secret = secret or os.getenv("UNSUBSCRIBE_SECRET")
+    if not secret:
+        return None
+    return hmac.new(secret.encode("utf-8"), subscriber.lower().encode("utf-8"), hashlib.sha256).hexdigest()[:32]
+
+
+class RenderedNewsletter:
+    """
+    A newsletter rendered once per digest. The MIME body is serialized a single
+    time; message_for() only prepends the per-recipient headers.
+    """
 
+    def __init__(self, subject, text, html, sender):
+        self.subject = subject
+        self.sender = sender
+        msg = MIMEMultipart("alternative")
+        msg["Subject"] = subject
+        msg["From"] = sender
+        msg.attach(MIMEText(text, "plain"))
+        msg.attach(MIMEText(html, "html"))
+        self.body = msg.as_bytes(policy=email.policy.SMTP)
+
+    def message_for(self, subscriber, token=None):
+        """Return the raw message for one subscriber, stamped with To and unsubscribe headers."""
+        headers = f"To: {subscriber}\r\n"
+        if self.sender:
+            unsubscribe_subject = f"unsubscribe {token}" if token else "unsubscribe"
+            headers += f"List-Unsubscribe: <mailto:{self.sender}?subject={quote(unsubscribe_subject)}>\r\n"
+        return headers.encode("utf-8") + self.body
+
+
+def render_newsletter(summaries, sender):
+    """
+    Render the plain-text and HTML newsletter bodies once for all subscribers.
+    
+    Args:
+        summaries (dict): Dictionary with one key-summary pair, where summary contains the title.
+        sender (str): Email address the newsletter is sent from.
+    """
     # Get the current date dynamically for the subject
     current_date = datetime.now().strftime("%B %d, %Y")  # e.g., "March 02, 2025"
     subject = f"Weekly AI Newsletter - {current_date}"
 
-    msg = MIMEMultipart("alternative")
-    msg["Subject"] = subject
-    msg["From"] = EMAIL_SENDER
-    msg["To"] = subscriber
-
     # Extract summary from the dictionary
     _, summary = next(iter(summaries.items()))  # Key is not the title, so ignore it
 
@@ -167,19 +278,65 @@ def send_email(summaries, subscriber):
     </html>
     """
 
-    msg.attach(MIMEText(text, "plain"))
-    msg.attach(MIMEText(html, "html"))
+    return RenderedNewsletter(subject, text, html, sender)
+
+
+def send_email(summaries, subscriber, connection=None, newsletter=None):
+    """
+    Send an email with a single summary to a subscriber.
+    
+    Args:
+        summaries (dict): Dictionary with one key-summary pair, where summary contains the title.
+        subscriber (str): Email address of the subscriber.
+        connection (SMTPConnection): Optional open connection to reuse.
+        newsletter (RenderedNewsletter): Optional pre-rendered newsletter; rendered from summaries if omitted.
+    """
+    if connection is None:
+        EMAIL_SENDER, EMAIL_PASSWORD = _load_credentials()
+        with SMTPConnection(EMAIL_SENDER, EMAIL_PASSWORD) as connection:
+            return send_email(summaries, subscriber, connection, newsletter)
+
+    if newsletter is None:
+        newsletter = render_newsletter(summaries, connection.sender)
 
     # Email sending logic
     try:
-        with smtplib.SMTP("smtp.gmail.com", 587) as server:
-            server.starttls()
-            server.login(EMAIL_SENDER, EMAIL_PASSWORD)
-            server.send_message(msg)
+        connection.send(subscriber, newsletter.message_for(subscriber, unsubscribe_token(subscriber)))
         logging.info(f"Email sent to {subscriber}")
     except smtplib.SMTPException as e:
-        logging.error(f"Failed to send to {subscriber} via Gmail: {e}")
+        logging.error(f"Failed to send to {subscriber} via {connection.host}: {e}")
         raise
     except Exception as e:
         logging.error(f"Unexpected error sending to {subscriber}: {e}")
-        raise
\ No newline at end of file
+        raise
+
+
+def send_bulk_email(summaries, subscribers, connection=None):
+    """
+    Render the newsletter once and send it to many subscribers over one reused
+    SMTP connection.
+    
+    Returns:
+        dict: Maps each subscriber to None on success, or the error message on failure.
+    """
+    owns_connection = connection is None
+    if owns_connection:
+        EMAIL_SENDER, EMAIL_PASSWORD = _load_credentials()
+        connection = SMTPConnection(EMAIL_SENDER, EMAIL_PASSWORD)
+
+    newsletter = render_newsletter(summaries, connection.sender)
+    results = {}
+    try:
+        for subscriber in subscribers:
+            try:
+                send_email(summaries, subscriber, connection, newsletter)
+                results[subscriber] = None
+            except Exception as e:
+                results[subscriber] = str(e)
+    finally:
+        if owns_connection:
+            connection.close()
+
+    failed = sum(1 for error in results.values() if error)
+    logging.info(f"Bulk send finished: {len(results) - failed} sent, {failed} failed")
+    return results
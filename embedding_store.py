@@ -0,0 +1,231 @@
+# embedding_store.py
+import os
+import json
+import hashlib
+import numpy as np
+from utils import log
+
+
+def text_key(text):
+    """Hash of a text with whitespace normalized, used as its embedding ID."""
+    return hashlib.sha1(" ".join(text.split()).encode("utf-8")).hexdigest()
+
+
+class LSHIndex:
+    """
+    Approximate nearest-neighbour index over L2-normalized vectors using
+    random-hyperplane LSH: each of `n_tables` tables buckets vectors by the
+    signs of `n_bits` random projections, taken around the data's mean so
+    buckets stay balanced. Candidates from matching buckets are reranked by
+    exact cosine similarity.
+    """
+
+    def __init__(self, vectors, n_bits=10, n_tables=24, seed=0, chunk_size=8192):
+        self.vectors = vectors
+        self.n_bits = n_bits
+        rng = np.random.default_rng(seed)
+        self.planes = rng.standard_normal((n_tables, n_bits, vectors.shape[1])).astype(np.float32)
+        self._weights = (1 << np.arange(n_bits)).astype(np.int64)
+        self.center = np.zeros(vectors.shape[1], dtype=np.float32)
+        if len(vectors):
+            self.center = sum(
+                np.asarray(vectors[start:start + chunk_size], dtype=np.float64).sum(axis=0)
+                for start in range(0, len(vectors), chunk_size)
+            ).astype(np.float32) / len(vectors)
+
+        signatures = np.concatenate(
+            [self._signatures(vectors[start:start + chunk_size]) for start in range(0, len(vectors), chunk_size)],
+            axis=1,
+        ) if len(vectors) else np.zeros((n_tables, 0), dtype=np.int64)
+        self.tables = []
+        for table_signatures in signatures:
+            order = np.argsort(table_signatures, kind="stable")
+            keys, starts = np.unique(table_signatures[order], return_index=True)
+            self.tables.append({key: rows for key, rows in zip(keys.tolist(), np.split(order, starts[1:]))})
+
+    def _signatures(self, vectors):
+        """Return an (n_tables, n) array of bucket keys."""
+        projections = np.einsum("tbd,nd->tnb", self.planes, np.asarray(vectors, dtype=np.float32) - self.center)
+        return (projections > 0).astype(np.int64) @ self._weights
+
+    def query(self, queries, k=5, exclude=None):
+        """
+        Return (rows, similarities), each shaped (len(queries), k), for the
+        approximate top-k neighbours of each query. Rows flagged in the boolean
+        `exclude` mask are skipped; missing neighbours are -1 with similarity 0.
+        """
+        queries = np.asarray(queries, dtype=np.float32)
+        signatures = self._signatures(queries)
+        rows = np.full((len(queries), k), -1, dtype=np.int64)
+        similarities = np.zeros((len(queries), k), dtype=np.float32)
+        empty = np.zeros(0, dtype=np.int64)
+        for i, query in enumerate(queries):
+            candidates = np.unique(np.concatenate(
+                [table.get(int(signatures[t, i]), empty) for t, table in enumerate(self.tables)]
+            ))
+            if exclude is not None and len(candidates):
+                candidates = candidates[~exclude[candidates]]
+            if not len(candidates):
+                continue
+            scores = np.asarray(self.vectors[candidates]) @ query
+            top = np.argsort(-scores)[:k]
+            rows[i, :len(top)] = candidates[top]
+            similarities[i, :len(top)] = scores[top]
+        return rows, similarities
+
+
+class EmbeddingStore:
+    """
+    Persistent embedding cache keyed by text hash. Vectors are appended to a
+    raw float32 file read back as a memory-mapped (n, dim) matrix; an
+    append-only JSON-lines index maps each row to its key and metadata (e.g.
+    the tweet date). Only texts not already stored are ever embedded.
+    """
+
+    def __init__(self, directory="cache/embeddings"):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.vectors_path = os.path.join(directory, "vectors.f32")
+        self.index_path = os.path.join(directory, "index.jsonl")
+        self.meta_path = os.path.join(directory, "meta.json")
+        self.dim = None
+        self.model = None
+        self.rows = {}      # key -> row
+        self.metadata = []  # row -> metadata dict
+        self._vectors = None
+        self._index = None
+
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            self.dim, self.model = meta["dim"], meta.get("model")
+        if self.dim:
+            self._load_index()
+
+    def _load_index(self):
+        """
+        Read the index, then cut both files back to the rows present in both,
+        dropping whatever an interrupted add() left behind: vectors without an
+        index line, or index lines without a vector. Otherwise later appends
+        would be misaligned with their rows.
+        """
+        row_bytes = 4 * self.dim
+        stored_rows = os.path.getsize(self.vectors_path) // row_bytes if os.path.exists(self.vectors_path) else 0
+        index_bytes = 0
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "rb") as f:
+                for line in f:
+                    if len(self.metadata) >= stored_rows or not line.endswith(b"\n"):
+                        break  # Index line written without its vector, or cut off mid-write
+                    entry = json.loads(line)
+                    self.rows[entry.pop("key")] = len(self.metadata)
+                    self.metadata.append(entry)
+                    index_bytes += len(line)
+            self._truncate(self.index_path, index_bytes)
+        self._truncate(self.vectors_path, len(self.metadata) * row_bytes)
+
+    @staticmethod
+    def _truncate(path, size):
+        if os.path.exists(path) and os.path.getsize(path) > size:
+            log(f"Dropping {os.path.getsize(path) - size} bytes left in {path} by an interrupted write")
+            os.truncate(path, size)
+
+    def __len__(self):
+        return len(self.metadata)
+
+    def vectors(self):
+        """The stored embeddings as a read-only memory-mapped float32 matrix."""
+        if self._vectors is None:
+            if not len(self):
+                return np.zeros((0, self.dim or 0), dtype=np.float32)
+            self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(len(self), self.dim))
+        return self._vectors
+
+    def index(self):
+        """The LSH index over all stored vectors, rebuilt after new rows are added."""
+        if self._index is None:
+            self._index = LSHIndex(self.vectors())
+        return self._index
+
+    def add(self, keys, vectors, metadata=None, model=None):
+        """Append vectors for new keys."""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if self.dim is None:
+            self.dim, self.model = vectors.shape[1], model
+            with open(self.meta_path, "w", encoding="utf-8") as f:
+                json.dump({"dim": self.dim, "model": model}, f)
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match the store ({self.dim})")
+        elif model and self.model and model != self.model:
+            raise ValueError(f"Embedding model {model} does not match the store ({self.model})")
+        metadata = metadata or [{} for _ in keys]
+
+        # Vectors first, so a crash never leaves an index line without its vector
+        with open(self.vectors_path, "ab") as f:
+            f.write(vectors.tobytes())
+        with open(self.index_path, "a", encoding="utf-8") as f:
+            for key, meta in zip(keys, metadata):
+                f.write(json.dumps({"key": key, **meta}) + "\n")
+                self.rows[key] = len(self.metadata)
+                self.metadata.append(meta)
+        self._vectors = None
+        self._index = None
+
+    def embed(self, texts, embedder, metadata=None):
+        """
+        Return an (n, dim) matrix of embeddings for `texts`, embedding only
+        texts not already in the store (in one batch) and storing them with
+        their `metadata`.
+        """
+        keys = [text_key(text) for text in texts]
+        missing = {}
+        for i, key in enumerate(keys):
+            if key not in self.rows and key not in missing:
+                missing[key] = i
+        if missing:
+            positions = list(missing.values())
+            log(f"Embedding {len(positions)} new texts ({len(texts) - len(positions)} cached)...")
+            self.add(
+                list(missing),
+                embedder.embed([texts[i] for i in positions]),
+                [metadata[i] for i in positions] if metadata else None,
+                model=getattr(embedder, "model_name", None),
+            )
+        if not keys:
+            return np.zeros((0, self.dim or 0), dtype=np.float32)
+        return np.asarray(self.vectors()[[self.rows[key] for key in keys]])
+
+    def nearest(self, vectors, k=5, exclude_dates=()):
+        """
+        Approximate top-k stored neighbours of each vector, skipping rows whose
+        metadata date is in `exclude_dates`. Returns (rows, similarities).
+        """
+        exclude = None
+        if exclude_dates:
+            exclude_dates = set(exclude_dates)
+            exclude = np.array([meta.get("date") in exclude_dates for meta in self.metadata], dtype=bool)
+        return self.index().query(vectors, k, exclude)
+
+    def covered_before(self, texts, embedder, exclude_dates=(), threshold=0.85, metadata=None):
+        """
+        For each text, return the metadata of the most similar stored text if
+        its cosine similarity is at least `threshold` (ignoring rows dated in
+        `exclude_dates`, typically the current week), else None.
+        """
+        rows, similarities = self.nearest(self.embed(texts, embedder, metadata), 1, exclude_dates)
+        return [
+            {**self.metadata[row], "similarity": float(similarity)} if row >= 0 and similarity >= threshold else None
+            for row, similarity in zip(rows[:, 0], similarities[:, 0])
+        ]
+
+
+class CachedEmbedder:
+    """Embedder wrapper that reads and writes through an EmbeddingStore."""
+
+    def __init__(self, embedder, store):
+        self.embedder = embedder
+        self.store = store
+        self.model_name = getattr(embedder, "model_name", None)
+
+    def embed(self, texts, metadata=None):
+        return self.store.embed(list(texts), self.embedder, metadata)
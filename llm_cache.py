@@ -0,0 +1,99 @@
+# llm_cache.py
+import os
+import json
+import hashlib
+import tempfile
+import unicodedata
+from utils import log
+
+
+def normalize_context(context):
+    """Normalize prompt context so cosmetic whitespace changes do not miss the cache."""
+    context = unicodedata.normalize("NFC", context).replace("\r\n", "\n").replace("\r", "\n")
+    return "\n".join(line.strip() for line in context.split("\n")).strip()
+
+
+class LLMResponseCache:
+    """
+    Content-addressed disk cache of LLM responses. Entries are keyed by a hash of
+    (model name, temperature, prompt template key and text, normalized context)
+    and stored as one JSON file each. When the directory grows past `max_bytes`,
+    the least recently used entries are deleted.
+    """
+
+    def __init__(self, directory="cache/llm", max_bytes=200 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def make_key(model_name, temperature, prompt_key, prompt_text, context):
+        payload = json.dumps(
+            [str(model_name), temperature, prompt_key, prompt_text, normalize_context(context)],
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        """Return the cached response for `key`, or None."""
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                response = json.load(f)["response"]
+        except (OSError, ValueError, KeyError):
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)  # Mark as recently used
+        except FileNotFoundError:
+            pass  # Evicted by another thread since it was read
+        self.hits += 1
+        return response
+
+    def put(self, key, response, **metadata):
+        """Store a response under `key`, then enforce the size bound."""
+        # A unique temp file per write, so threads storing the same key never share one
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=f"{key}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"response": response, **metadata}, f, ensure_ascii=False)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.evict()
+
+    def evict(self):
+        """
+        Delete least recently used entries until the cache fits in `max_bytes`.
+        Entries removed concurrently by another thread or process are skipped.
+        """
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".json"):
+                try:
+                    stat = os.stat(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            return
+        for _, size, name in sorted(entries):
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+            total -= size
+            if total <= self.max_bytes:
+                break
+        log(f"LLM cache evicted entries down to {total} bytes.")
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
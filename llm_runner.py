@@ -0,0 +1,101 @@
+# llm_runner.py
+import random
+import asyncio
+from utils import log
+
+RATE_LIMIT_MARKERS = ("429", "rate limit", "rate_limit", "resource exhausted", "resource_exhausted", "quota")
+
+
+def is_rate_limit_error(error):
+    """Best-effort check for provider rate-limit errors (OpenAI, DeepSeek, Gemini)."""
+    if type(error).__name__ in ("RateLimitError", "ResourceExhausted", "TooManyRequests"):
+        return True
+    if getattr(error, "status_code", None) == 429:
+        return True
+    message = str(error).lower()
+    return any(marker in message for marker in RATE_LIMIT_MARKERS)
+
+
+class RetryPolicy:
+    """
+    Per-call timeout for a single LLM request, retrying rate-limit errors and
+    timeouts with jittered exponential backoff. The summarizer's async methods
+    apply it to every call, so one failed request never repeats the others.
+    """
+
+    def __init__(self, timeout=120, max_retries=4, base_delay=2.0, max_delay=60.0):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    async def run(self, make_call, label="LLM call"):
+        """Await `make_call()` (a fresh coroutine per attempt) under the timeout, retrying as needed."""
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await asyncio.wait_for(make_call(), self.timeout)
+            except Exception as e:
+                retryable = isinstance(e, asyncio.TimeoutError) or is_rate_limit_error(e)
+                if not retryable or attempt == self.max_retries:
+                    raise
+                reason = "Timed out" if isinstance(e, asyncio.TimeoutError) else f"Rate limited ({e})"
+            delay = min(self.max_delay, self.base_delay * 2 ** attempt) * random.uniform(0.5, 1.0)
+            log(f"{reason} on {label}; retrying in {delay:.1f}s ({attempt + 1}/{self.max_retries})...")
+            await asyncio.sleep(delay)
+
+
+async def _run_job(summarizer, documents, prompt_template, semaphore, retry, map_reduce, chunk_tokens,
+                   sections=None):
+    """Run one summary job; each LLM call inside it gets its own timeout and retries."""
+    async with semaphore:
+        if sections is not None:
+            return await summarizer.agenerate_summary_by_topic(
+                sections, prompt_template=prompt_template, chunk_tokens=chunk_tokens, retry=retry
+            )
+        if map_reduce:
+            return await summarizer.agenerate_summary_map_reduce(
+                documents, prompt_template=prompt_template, chunk_tokens=chunk_tokens, retry=retry
+            )
+        return await summarizer.agenerate_summary(documents, prompt_template=prompt_template, retry=retry)
+
+
+async def run_summaries(jobs, documents, max_concurrency=2, timeout=120, max_retries=4,
+                        base_delay=2.0, max_delay=60.0, map_reduce=True, chunk_tokens=6000, sections=None):
+    """
+    Run several summary jobs concurrently and return {title: summary}.
+
+    Args:
+        jobs (dict): Maps a title to a (SummaryGenerator, prompt_template) pair,
+            e.g. {"Last Week (Gemini)": (gemini_summarizer, "v12")}.
+        documents (list): Preprocessed documents shared by every job.
+        chunk_tokens (int): Token budget of one request in map-reduce mode.
+        sections (dict): Optional {topic: [Documents]}; when given, each job
+            summarizes the topics separately and merges the drafts.
+        timeout, max_retries, base_delay, max_delay: RetryPolicy applied to
+            every LLM call, not to whole jobs.
+
+    Jobs that still fail after retrying are logged and left out of the result.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    retry = RetryPolicy(timeout, max_retries, base_delay, max_delay)
+    titles = list(jobs)
+    results = await asyncio.gather(
+        *(
+            _run_job(summarizer, documents, prompt_template, semaphore, retry, map_reduce, chunk_tokens, sections)
+            for title, (summarizer, prompt_template) in jobs.items()
+        ),
+        return_exceptions=True,
+    )
+
+    summaries = {}
+    for title, result in zip(titles, results):
+        if isinstance(result, BaseException):
+            log(f"Summary '{title}' failed: {str(result)}")
+        else:
+            summaries[title] = result
+    return summaries
+
+
+def summarize_all(jobs, documents, **kwargs):
+    """Blocking wrapper around run_summaries for synchronous callers such as main.py."""
+    return asyncio.run(run_summaries(jobs, documents, **kwargs))
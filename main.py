@@ -1,13 +1,21 @@
 import os
-from webdriver_manager import WebDriverManager
-from twitter_scraper import TwitterScraper
+from scrape_scheduler import scrape_lists_to_store
 from preprocessor import DataPreprocessor
 from summarizer import SummaryGenerator
-from utils import log, save_to_csv
+from llm_runner import summarize_all
+from llm_cache import LLMResponseCache
+from url_cache import URLCache
+from url_resolver import URLResolver
+from tweet_store import CheckpointStore, TweetStore, write_tweets
+from utils import log, save_to_csv, assign_thread_numbers
+from dedup import deduplicate
+from relevance import RelevanceRanker, load_history, load_history_texts
+from topics import TopicClusterer, load_embedder
+from embedding_store import EmbeddingStore, CachedEmbedder
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
-from email_sender import send_email
-from subscribers import SUBSCRIBERS  # Import SUBSCRIBERS from subscribers.py
+from email_delivery import DeliveryAborted, deliver_newsletter
+from subscribers import SUBSCRIBERS, SubscriberRepository
 
 # Load environment variables
 load_dotenv()
@@ -18,8 +26,26 @@ def main():
     TWITTER_PASSWORD = os.getenv("TWITTER_PASSWORD")
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
     GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-    URL = "https://x.com/i/lists/1866834968594317670"
+    LIST_URLS = [
+        "https://x.com/i/lists/1866834968594317670",
+    ]
+    SCRAPE_WORKERS = 2
+    WARM_SPARES = 1  # Logged-in standby browsers per worker for fast crash recovery
+    HEAP_LIMIT_MB = 1024  # Reload the list page when Chrome's JS heap exceeds this
+    SPOOL_DIR = "cache/spool"  # Scraped rows are written here in batches during a run
     OUTPUT_DIR = "output"
+    URL_CACHE_PATH = "cache/url_cache.sqlite"
+    LLM_CACHE_DIR = "cache/llm"
+    SUBSCRIBERS_DB_PATH = "data/subscribers.sqlite"
+    CHECKPOINT_PATH = "cache/checkpoints.json"
+    TWEET_STORE_PATH = f"{OUTPUT_DIR}/tweet_store"
+    TOKEN_BUDGET = 6000  # Max prompt tokens of context per LLM request
+    HISTORY_DIR = "data"  # Prior weeks' exports, used to score novelty
+    TOP_K_THREADS = 400
+    RELEVANCE_TOKEN_BUDGET = 5 * TOKEN_BUDGET  # Total context kept after ranking
+    N_TOPICS = 6  # Newsletter sections summarized in parallel
+    EMBEDDING_DIR = "cache/embeddings"  # Embeddings of history and past threads, reused across runs
+    AUTHOR_WEIGHTS = {}  # e.g. {"@karpathy": 1.0}; unlisted authors get relevance.DEFAULT_AUTHOR_WEIGHT
 
     required_vars = {
         "TWITTER_USERNAME": TWITTER_USERNAME,
@@ -38,41 +64,74 @@ def main():
 
     # Step 1: Scrape Data
     log("Starting Twitter scraping...")
-    driver_manager = WebDriverManager(TWITTER_USERNAME, TWITTER_PASSWORD, headless=False)
-    driver_manager.initialize_driver()
-    scraper = TwitterScraper(driver_manager)
-    df = scraper.fetch_tweets_list(URL, START_DATE, END_DATE)
-    driver_manager.close()
+    checkpoints = CheckpointStore(CHECKPOINT_PATH)
+    tweet_store = TweetStore(TWEET_STORE_PATH)
+    # Newly scraped tweets are streamed into the local store; then reload the full window
+    scrape_lists_to_store(
+        LIST_URLS, START_DATE, END_DATE, TWITTER_USERNAME, TWITTER_PASSWORD, tweet_store, checkpoints,
+        spool_dir=SPOOL_DIR, workers=SCRAPE_WORKERS, headless=False, warm_spares=WARM_SPARES,
+        heap_limit_mb=HEAP_LIMIT_MB,
+        since_ids={url: checkpoints.since_id(url) for url in LIST_URLS}
+    )
+    df = tweet_store.load(START_DATE, END_DATE)
 
     if df.empty:
         log("No data scraped. Exiting.")
         return
 
+    df = assign_thread_numbers(df)
+    # Drop repeated tweets and copy-pasted announcements before any LLM tokens are spent
+    df = deduplicate(df)
+
     # Step 2: Save Data (No grouping needed)
-    csv_file = f"{OUTPUT_DIR}/tweets_last_week.csv"
+    tweets_file = f"{OUTPUT_DIR}/tweets_last_week.parquet"
     if not os.path.exists(OUTPUT_DIR):
         os.makedirs(OUTPUT_DIR)
         log(f"Created output directory: {OUTPUT_DIR}")
-    log(f"Saving last week's data to {csv_file}...")
-    df.to_csv(csv_file, index=False)
+    log(f"Saving last week's data to {tweets_file}...")
+    write_tweets(df, tweets_file)
     log("Data saved successfully.")
 
     # Step 3: Preprocess and Summarize
-    log(f"Preprocessing and summarizing last week's data from {csv_file}...")
-    preprocessor = DataPreprocessor(csv_file)
+    log(f"Preprocessing and summarizing last week's data from {tweets_file}...")
+    url_cache = URLCache(URL_CACHE_PATH)
+    preprocessor = DataPreprocessor(tweets_file, resolver=URLResolver(cache=url_cache), token_budget=TOKEN_BUDGET)
     documents = preprocessor.preprocess_data(include_urls=True)
+    estimate = preprocessor.token_estimate()
+    log(f"Prompt size estimate: {estimate['tokens']} tokens in {estimate['threads']} threads, "
+        f"{estimate['requests']} requests at {estimate['token_budget']} tokens each.")
 
-    summaries = {}
+    # Keep only the most relevant threads within the context budget.
+    # With an embedding model, history is embedded once into the store and
+    # novelty is scored by nearest-neighbour lookup; otherwise TF-IDF is used.
+    week_dates = set(df["date"].astype(str))
+    embedder = load_embedder()
+    if embedder is not None:
+        embedder = CachedEmbedder(embedder, EmbeddingStore(EMBEDDING_DIR))
+        history = load_history(HISTORY_DIR, exclude_dates=week_dates)
+        embedder.embed(history["text"].tolist(), history[["date"]].to_dict("records"))
+        ranker = RelevanceRanker(author_weights=AUTHOR_WEIGHTS, embedder=embedder, exclude_dates=week_dates)
+    else:
+        ranker = RelevanceRanker(load_history_texts(HISTORY_DIR, exclude_dates=week_dates), author_weights=AUTHOR_WEIGHTS)
+    documents = ranker.select(documents, top_k=TOP_K_THREADS, token_budget=RELEVANCE_TOKEN_BUDGET)
 
-    # Summarize with OpenAI
-    # openai_summarizer = SummaryGenerator(model_type="openai", openai_api_key=OPENAI_API_KEY)
-    # summary_openai = openai_summarizer.generate_summary(documents, prompt_template="v11")
-    # summaries["Last Week (OpenAI)"] = summary_openai
+    # Group threads into topics so each section gets its own, smaller prompt
+    sections = TopicClusterer(n_topics=N_TOPICS, embedder=embedder).cluster(documents)
+    log(f"URL cache stats: {url_cache.stats()}")
+    url_cache.close()
 
-    # Summarize with Gemini
-    gemini_summarizer = SummaryGenerator(model_type="gemini", google_api_key=GOOGLE_API_KEY)
-    summary_gemini = gemini_summarizer.generate_summary(documents, prompt_template="v12")
-    summaries["Last Week (Gemini)"] = summary_gemini
+    # Summarize with every configured provider concurrently.
+    # The first entry is the one emailed to subscribers.
+    llm_cache = LLMResponseCache(LLM_CACHE_DIR)
+    jobs = {
+        "Last Week (Gemini)": (SummaryGenerator(model_type="gemini", google_api_key=GOOGLE_API_KEY, cache=llm_cache), "v12"),
+        # "Last Week (OpenAI)": (SummaryGenerator(model_type="openai", openai_api_key=OPENAI_API_KEY, cache=llm_cache), "v11"),
+    }
+    summaries = summarize_all(jobs, documents, chunk_tokens=TOKEN_BUDGET, sections=sections)
+    log(f"LLM cache stats: {llm_cache.stats()}")
+    if not summaries:
+        log("No summaries generated. Exiting.")
+        return
 
     # Display summaries
     for title, summary in summaries.items():
@@ -82,12 +141,22 @@ def main():
 
     # Step 4: Send Email to Subscribers
     log("Sending emails to subscribers...")
-    for subscriber in SUBSCRIBERS:
-        try:
-            send_email(summaries, subscriber, START_DATE, END_DATE)
-            log(f"Successfully sent email to {subscriber}")
-        except Exception as e:
-            log(f"Failed to send email to {subscriber}: {str(e)}")
+    subscriber_repo = SubscriberRepository(SUBSCRIBERS_DB_PATH)
+    subscriber_repo.add_many(SUBSCRIBERS)  # Import any legacy hard-coded addresses
+    log(f"Delivering to {subscriber_repo.count()} active subscribers...")
+    try:
+        report = deliver_newsletter(summaries, subscriber_repo.iter_emails(), is_subscribed=subscriber_repo.is_active)
+    except DeliveryAborted as e:
+        # Bad credentials or a refused sender: nothing is charged to the subscribers
+        log(f"Email delivery aborted: {e}")
+        report = e.report
+    for subscriber, error in {**report.bounced, **report.failed, **report.deferred}.items():
+        log(f"Failed to send email to {subscriber}: {error}")
+    # Only addresses the server permanently refused are marked as bounced
+    for subscriber in report.bounced:
+        subscriber_repo.mark_bounced(subscriber)
+    subscriber_repo.close()
+    log(f"Delivery report: {report.summary()}")
     log("Email sending completed.")
 
 if __name__ == "__main__":
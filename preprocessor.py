@@ -1,64 +1,110 @@
 # preprocessor.py
 import re
-import time
-import requests
 import pandas as pd
-from langchain_community.document_loaders.telegram import text_to_docs
+from langchain_core.documents import Document
+from url_resolver import URLResolver, URL_PATTERN
+from tweet_store import read_tweets
+from token_utils import count_tokens, pack_by_tokens
+
+def _thread_media_type(media_types):
+    """The richest media type in a thread: Video, then Image, then No media."""
+    media_types = set(media_types)
+    for media_type in ("Video", "Image"):
+        if media_type in media_types:
+            return media_type
+    return "No media"
 
 class DataPreprocessor:
-    def __init__(self, file_path):
-        """Initialize with the path to the CSV file."""
+    def __init__(self, file_path, resolver=None, token_budget=6000):
+        """
+        Initialize with the path to the tweets file (Parquet or CSV), an optional
+        URL resolver and the token budget of a single LLM request.
+        """
         self.file_path = file_path
+        self.resolver = resolver or URLResolver()
+        self.token_budget = token_budget
         self.df = None
         self.combined_tweets = None
 
     def resolve_shortened_url(self, short_url):
         """Resolve a shortened URL to its full form."""
-        try:
-            response = requests.head(short_url, allow_redirects=True)
-            time.sleep(0.5)  # Avoid rate limiting
-            return response.url
-        except requests.RequestException as e:
-            print(f"Error resolving URL {short_url}: {e}")
-            return short_url
+        return self.resolver.resolve(short_url)
 
     def resolve_urls_in_text(self, text):
         """Extract and resolve URLs in a text string."""
-        url_pattern = r'https?://\S+|www\.\S+'
-        urls = re.findall(url_pattern, text)
-        for url in urls:
-            resolved_url = self.resolve_shortened_url(url)
-            text = text.replace(url, resolved_url)
-        return text
+        mapping = self.resolver.resolve_many(re.findall(URL_PATTERN, text))
+        return re.sub(URL_PATTERN, lambda m: mapping.get(m.group(0), m.group(0)), text)
+
+    def resolve_all_urls(self):
+        """
+        Resolve every URL in the `text` and `mentioned_urls` columns in one batch,
+        then rewrite both columns from the resolved mapping.
+        """
+        text_urls = self.df['text'].str.findall(URL_PATTERN).explode()
+        mentioned_urls = self.df['mentioned_urls'].explode()
+        all_urls = pd.concat([text_urls, mentioned_urls]).dropna().unique()
+        mapping = self.resolver.resolve_many(all_urls)
+
+        self.df['text'] = self.resolver.replace_urls(self.df['text'], mapping)
+        self.df['mentioned_urls'] = [
+            [mapping.get(url, url) for url in urls] for urls in self.df['mentioned_urls']
+        ]
 
     def preprocess_data(self, include_urls=True):
-        """Preprocess the CSV data and combine tweets by thread."""
-        # Load data
-        self.df = pd.read_csv(self.file_path)
+        """
+        Preprocess the tweets data and return one Document per thread, with the
+        thread's author, number, date, tweet URLs, links, media type and token
+        count as metadata.
+        """
+        # Load data; list columns come back as Python lists
+        self.df = read_tweets(self.file_path)
         self.df['text'] = self.df['text'].fillna('').astype(str)
 
         if include_urls:
-            # Resolve URLs in text
-            self.df['text'] = self.df['text'].apply(self.resolve_urls_in_text)
-            # Handle mentioned_urls column
-            self.df['mentioned_urls'] = self.df['mentioned_urls'].apply(
-                lambda x: [self.resolve_shortened_url(url) for url in eval(x)] if pd.notna(x) else []
-            )
+            # Resolve URLs in text and mentioned_urls together
+            self.resolve_all_urls()
             # Combine text and URLs
             self.df['text_with_urls'] = self.df.apply(
                 lambda row: row['text'] + ' ' + ' '.join(row['mentioned_urls']), axis=1
             )
-            # Group by thread_number
-            df_new = self.df.groupby("thread_number")["text_with_urls"].apply(" ".join).reset_index()
-            df_new = df_new.rename(columns={"text_with_urls": "combined_tweet"})
+            text_column = "text_with_urls"
         else:
-            # Group by thread_number without URLs
-            df_new = self.df.groupby("thread_number")["text"].apply(" ".join).reset_index()
-            df_new = df_new.rename(columns={"text": "combined_tweet"})
+            text_column = "text"
+
+        # Group by thread_number, keeping tweets in their original order
+        threads = self.df.groupby("thread_number", sort=True).agg(
+            combined_tweet=(text_column, " ".join),
+            author_name=("author_name", "first"),
+            author_handle=("author_handle", "first"),
+            date=("date", "first"),
+            time=("time", "first"),
+            tweet_urls=("tweet_url", list),
+            urls=("mentioned_urls", lambda s: list(dict.fromkeys(url for urls in s for url in urls))),
+            tweet_count=("text", "size"),
+            media_type=("media_type", _thread_media_type),
+        ).reset_index()
+        if "duplicate_count" in self.df.columns:
+            threads["duplicate_count"] = self.df.groupby("thread_number", sort=True)["duplicate_count"].sum().to_numpy()
+
+        # Filter threads longer than 20 characters
+        threads = threads[threads["combined_tweet"].str.len() > 20]
+        self.combined_tweets = [
+            Document(page_content=thread.pop("combined_tweet"), metadata=thread)
+            for thread in threads.to_dict("records")
+        ]
+        for doc in self.combined_tweets:
+            doc.metadata["tokens"] = count_tokens(doc.page_content)
 
-        # Filter tweets longer than 20 characters
-        combined_tweets = df_new['combined_tweet'].to_list()
-        combined_tweets = [i for i in combined_tweets if len(i) > 20]
-        self.combined_tweets = text_to_docs(str(combined_tweets))
+        return self.combined_tweets
 
-        return self.combined_tweets
\ No newline at end of file
+    def token_estimate(self, token_budget=None):
+        """Estimate prompt size before any LLM call: threads, tokens and requests at the budget."""
+        token_budget = token_budget or self.token_budget
+        tokens = [doc.metadata["tokens"] for doc in self.combined_tweets]
+        return {
+            "threads": len(tokens),
+            "tokens": sum(tokens),
+            "largest_thread_tokens": max(tokens, default=0),
+            "token_budget": token_budget,
+            "requests": len(pack_by_tokens(self.combined_tweets, token_budget, count=lambda doc: doc.metadata["tokens"])),
+        }
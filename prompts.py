@@ -255,4 +255,36 @@ PROMPTS = {
     
     📩 **Want more AI insights? Subscribe & stay ahead of the curve!**  
 """
-}
\ No newline at end of file
+,
+    "map_v1": """
+    You are an expert AI news analyst. Below is one batch of tweets from the past 7 days; other batches are being processed separately and all notes will later be merged into a weekly AI newsletter.
+    
+    ### Task:
+    Extract every significant AI-related update from this batch as concise notes.
+    
+    - Write one bullet per update: **what happened**, who is involved, and why it matters, in 1-2 sentences.
+    - Tag each bullet with the most relevant section: [Models], [Industry], [Products], [Research] or [Open Source].
+    - Keep every relevant link (papers, blogs, GitHub repos, announcements) next to its update.
+    - Merge tweets that describe the same update into a single bullet.
+    - Skip jokes, personal chatter and minor updates. Do not write a title or an introduction.
+    
+    ### Tweets:
+    {context}
+"""
+,
+    "section_v1": """
+    You are an expert AI news analyst. Below are tweets from the past 7 days that were grouped together because they cover one topic; other topics are being processed separately and all drafts will later be merged into a weekly AI newsletter.
+    
+    ### Task:
+    Write a draft newsletter section covering this topic.
+    
+    - Start with a short section heading that names the topic.
+    - Include **up to 5 key updates**, most significant first: **what happened**, who is involved, and why it matters, in 1-3 sentences each.
+    - Keep every relevant link (papers, blogs, GitHub repos, announcements) next to its update.
+    - Merge tweets that describe the same update into a single bullet.
+    - Skip jokes, personal chatter and minor updates. Do not write a newsletter title or an introduction.
+    
+    ### Tweets:
+    {context}
+"""
+}
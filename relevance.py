@@ -0,0 +1,143 @@
+# relevance.py
+import os
+import re
+import glob
+import math
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+from tweet_store import normalize_dates, read_tweets
+from utils import log
+
+# Relative weight of each signal in the final score
+SIGNAL_WEIGHTS = {
+    "author": 1.0,
+    "links": 0.5,
+    "media": 0.3,
+    "length": 0.5,
+    "novelty": 1.5,
+    "duplicates": 0.5,
+}
+MEDIA_SCORES = {"Video": 1.0, "Image": 0.6, "No media": 0.0}
+DEFAULT_AUTHOR_WEIGHT = 0.5
+# Links to these hosts are tweets or media, not external sources (t.co links are cards)
+INTERNAL_HOSTS = ("//x.com/", "//twitter.com/", "//help.x.com/", "pic.x.com/", "pic.twitter.com/")
+_URL_RE = re.compile(r"https?://\S+")
+
+
+def load_history(directory="data", exclude_dates=()):
+    """
+    Read the text and date of every tweet in the weekly exports (CSV or Parquet)
+    in `directory`, skipping tweets dated in `exclude_dates` (typically the week
+    being ranked, as YYYY-MM-DD). Older exports' DD-MM-YYYY dates are
+    normalized first.
+    """
+    paths = sorted(glob.glob(os.path.join(directory, "*.csv")) + glob.glob(os.path.join(directory, "*.parquet")))
+    exclude_dates = set(exclude_dates)
+    frames = []
+    for path in paths:
+        df = read_tweets(path)
+        df = df.assign(date=normalize_dates(df["date"]).fillna("") if "date" in df.columns else "")
+        frames.append(df.loc[~df["date"].isin(exclude_dates) & df["text"].notna(), ["text", "date"]])
+    history = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=["text", "date"])
+    history["text"] = history["text"].astype(str)
+    log(f"Loaded {len(history)} historical tweets from {len(paths)} files for novelty scoring.")
+    return history
+
+
+def load_history_texts(directory="data", exclude_dates=()):
+    """Texts of load_history(directory, exclude_dates)."""
+    return load_history(directory, exclude_dates)["text"].tolist()
+
+
+def _has_external_link(urls):
+    return any(not any(host in url for host in INTERNAL_HOSTS) for url in urls)
+
+
+class RelevanceRanker:
+    """
+    Rank thread Documents by cheap local signals and keep the best ones within
+    a token budget. Signals, each scaled to [0, 1]:
+
+    - author: weight from `author_weights` (keyed by @handle)
+    - links: thread links to an external source
+    - media: video > image > none
+    - length: log of the thread's token count
+    - novelty: 1 - highest cosine similarity to any historical tweet, using
+      TF-IDF, or embeddings when `embedder` is an embedding_store.CachedEmbedder
+      (whose store should already hold the history)
+    - duplicates: how many near-copies were collapsed into the thread
+
+    Stored embeddings dated in `exclude_dates` (the week being ranked) are not
+    treated as history.
+    """
+
+    def __init__(self, history_texts=(), author_weights=None, signal_weights=None, embedder=None, exclude_dates=()):
+        self.history_texts = list(history_texts)
+        self.author_weights = {handle.lower(): weight for handle, weight in (author_weights or {}).items()}
+        self.signal_weights = {**SIGNAL_WEIGHTS, **(signal_weights or {})}
+        self.embedder = embedder
+        self.exclude_dates = set(exclude_dates)
+
+    def _embedding_novelty(self, texts, dates):
+        vectors = self.embedder.embed(texts, [{"date": date} for date in dates])
+        _, similarities = self.embedder.store.nearest(vectors, 1, self.exclude_dates)
+        return 1.0 - np.clip(similarities[:, 0], 0.0, 1.0)
+
+    def _novelty(self, texts, chunk_size=512):
+        if not self.history_texts:
+            return np.ones(len(texts))
+        vectorizer = TfidfVectorizer(sublinear_tf=True, stop_words="english", min_df=2, max_features=100_000)
+        vectorizer.fit(self.history_texts + texts)
+        history = vectorizer.transform(self.history_texts).T.tocsr()
+        current = vectorizer.transform(texts)
+        # Rows are L2-normalized, so dot products are cosine similarities
+        best = np.zeros(len(texts))
+        for start in range(0, len(texts), chunk_size):
+            similarities = current[start:start + chunk_size] @ history
+            best[start:start + chunk_size] = similarities.max(axis=1).toarray().ravel()
+        return 1.0 - best
+
+    def score(self, documents):
+        """Return a DataFrame with one row of signals and a `score` per document."""
+        meta = pd.DataFrame([doc.metadata for doc in documents])
+        texts = [doc.page_content for doc in documents]
+        tokens = meta["tokens"].astype(float)
+        duplicates = meta["duplicate_count"].astype(float) if "duplicate_count" in meta else pd.Series(0.0, index=meta.index)
+
+        signals = pd.DataFrame({
+            "author": meta["author_handle"].astype(str).str.lower().map(self.author_weights).fillna(DEFAULT_AUTHOR_WEIGHT),
+            "links": [float(_has_external_link(urls + _URL_RE.findall(text))) for urls, text in zip(meta["urls"], texts)],
+            "media": meta["media_type"].map(MEDIA_SCORES).fillna(0.0),
+            "length": np.log1p(tokens) / math.log1p(max(tokens.max(), 1)),
+            "novelty": (self._embedding_novelty(texts, meta["date"].astype(str).tolist())
+                        if self.embedder is not None else self._novelty(texts)),
+            "duplicates": np.log1p(duplicates) / math.log1p(max(duplicates.max(), 1)),
+        })
+        signals["score"] = sum(signals[name] * weight for name, weight in self.signal_weights.items())
+        signals["tokens"] = tokens
+        return signals
+
+    def select(self, documents, top_k=None, token_budget=None):
+        """
+        Keep the highest-scoring documents, at most `top_k` of them and at most
+        `token_budget` tokens in total, returned in their original order with
+        their score in metadata["relevance"].
+        """
+        if not documents:
+            return []
+        signals = self.score(documents)
+        kept, total_tokens = [], 0
+        for i in signals["score"].sort_values(ascending=False, kind="stable").index:
+            if top_k is not None and len(kept) >= top_k:
+                break
+            tokens = signals.at[i, "tokens"]
+            if token_budget is not None and total_tokens + tokens > token_budget:
+                continue
+            kept.append(i)
+            total_tokens += tokens
+
+        for i, doc in enumerate(documents):
+            doc.metadata["relevance"] = round(float(signals.at[i, "score"]), 4)
+        log(f"Relevance ranking kept {len(kept)} of {len(documents)} threads ({int(total_tokens)} tokens).")
+        return [documents[i] for i in sorted(kept)]
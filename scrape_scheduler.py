@@ -0,0 +1,156 @@
+# scrape_scheduler.py
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing.util import Finalize
+import pandas as pd
+from webdriver_manager import WebDriverManager
+from browser_pool import BrowserPool
+from twitter_scraper import TwitterScraper
+from tweet_store import TweetSpool
+from utils import log, assign_thread_numbers
+
+# One browser session per worker process, created by _init_worker
+_scraper = None
+
+# Columns CheckpointStore.update reads
+CHECKPOINT_COLUMNS = ["tweet_url", "is_reposted", "date", "time"]
+
+
+def _init_worker(username, password, headless, mode, warm_spares=0, scraper_options=None):
+    """
+    Start this worker's WebDriverManager and close it when the process exits.
+    With `warm_spares`, the session comes from a BrowserPool that keeps that
+    many logged-in browsers ready to replace it after a crash.
+    """
+    global _scraper
+    capture_network = mode == "network"
+    if warm_spares:
+        pool = BrowserPool(username, password, spares=warm_spares, headless=headless,
+                           capture_network=capture_network)
+        driver_manager = pool.start().acquire()
+        Finalize(None, pool.close, exitpriority=10)
+    else:
+        driver_manager = WebDriverManager(username, password, headless=headless, capture_network=capture_network)
+        driver_manager.initialize_driver()
+    Finalize(None, driver_manager.close, exitpriority=20)
+    _scraper = TwitterScraper(driver_manager, **(scraper_options or {}))
+
+
+def _scrape_list(url, start_date, end_date, since_id, mode):
+    """
+    Scrape one list URL with this worker's browser session. Spooled rows come
+    back as their TweetSpool (part file paths), not as a DataFrame.
+
+    Returns:
+        tuple: (rows, whether the scrape reached the checkpoint or the start date).
+    """
+    fetch = {
+        "dom": _scraper.fetch_tweets_list,
+        "batched": _scraper.fetch_tweets_list_batched,
+        "network": _scraper.fetch_tweets_list_network,
+    }[mode]
+    df = fetch(url, start_date, end_date, since_id=since_id)
+    if not isinstance(df, TweetSpool):
+        # Thread numbers are reassigned after merging all lists
+        df = df.drop(columns=["thread_number"], errors="ignore")
+    return df, _scraper.last_fetch_complete
+
+
+def _scrape_all(urls, start_date, end_date, username, password, workers, headless, mode, since_ids,
+                warm_spares, heap_limit_mb, spool_dir):
+    """
+    Run the list scrapes across worker processes, yielding (url, rows, complete)
+    as each one finishes.
+    """
+    since_ids = since_ids or {}
+    workers = max(1, min(workers, len(urls)))
+    log(f"Scraping {len(urls)} lists with {workers} browser sessions...")
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(username, password, headless, mode, warm_spares,
+                  {"heap_limit_mb": heap_limit_mb, "spool_dir": spool_dir}),
+    ) as pool:
+        futures = {
+            pool.submit(_scrape_list, url, start_date, end_date, since_ids.get(url), mode): url
+            for url in urls
+        }
+        for future in as_completed(futures):
+            url = futures[future]
+            try:
+                result, complete = future.result()
+            except Exception as e:
+                log(f"Error scraping {url}: {str(e)}")
+                continue
+            log(f"Scraped {len(result)} tweets from {url}.")
+            yield url, result, complete
+
+
+def scrape_lists(urls, start_date, end_date, username, password, workers=2, headless=True,
+                 mode="batched", since_ids=None, time_threshold_minutes=2, warm_spares=0,
+                 heap_limit_mb=None):
+    """
+    Scrape several list URLs across a bounded pool of worker processes, each
+    owning one browser session (plus `warm_spares` standby browsers).
+    `heap_limit_mb` reloads pages whose JS heap grows beyond it. For long
+    backfills, use scrape_lists_to_store, which never holds all rows at once.
+
+    Returns:
+        tuple: (merged DataFrame deduplicated by tweet URL with thread numbers,
+                {url: DataFrame scraped from that list}).
+    """
+    per_list = {
+        url: df for url, df, _ in _scrape_all(urls, start_date, end_date, username, password, workers, headless,
+                                              mode, since_ids, warm_spares, heap_limit_mb, spool_dir=None)
+    }
+
+    frames = [df for df in per_list.values() if not df.empty]
+    if not frames:
+        return pd.DataFrame(), per_list
+    merged = pd.concat(frames, ignore_index=True).drop_duplicates(subset="tweet_url")
+    merged = assign_thread_numbers(merged, time_threshold_minutes)
+    log(f"Merged {len(merged)} unique tweets from {len(frames)} lists.")
+    return merged, per_list
+
+
+def _store_spool(url, spool, tweet_store, checkpoints=None, complete=True):
+    """
+    Append a list's spooled rows to `tweet_store` one part file at a time, then
+    advance its checkpoint if the scrape was `complete`. Returns the number of
+    rows added.
+    """
+    added = sum(tweet_store.append(part) for part in spool.dataframes())
+    if checkpoints is None:
+        return added
+    if not complete:
+        log(f"Scrape of {url} stopped early; keeping its checkpoint so the gap is collected next run.")
+        return added
+    # Only once every part is stored, so a failed append never skips rows on the next run
+    for part in spool.dataframes(columns=CHECKPOINT_COLUMNS):
+        checkpoints.update(url, part)
+    return added
+
+
+def scrape_lists_to_store(urls, start_date, end_date, username, password, tweet_store, checkpoints=None,
+                          spool_dir="cache/spool", workers=2, headless=True, mode="batched", since_ids=None,
+                          warm_spares=0, heap_limit_mb=None):
+    """
+    Scrape several list URLs like scrape_lists, but in bounded memory: each
+    worker spools its rows to Parquet parts under `spool_dir`, which are
+    streamed into `tweet_store` part by part as each list finishes, then
+    deleted. A list's checkpoint only advances when its scrape reached the
+    old checkpoint or the start date. Thread numbers are left to whoever
+    loads the store.
+
+    Returns:
+        dict: {url: number of new tweets added to the store}.
+    """
+    if not spool_dir:
+        raise ValueError("scrape_lists_to_store needs a spool_dir; use scrape_lists to scrape in memory")
+    added = {}
+    for url, spool, complete in _scrape_all(urls, start_date, end_date, username, password, workers, headless,
+                                            mode, since_ids, warm_spares, heap_limit_mb, spool_dir):
+        added[url] = _store_spool(url, spool, tweet_store, checkpoints, complete)
+        spool.clear()
+    log(f"Added {sum(added.values())} new tweets from {len(added)} lists to the store.")
+    return added
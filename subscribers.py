@@ -1 +1,120 @@
-SUBSCRIBERS = []
\ No newline at end of file
+# subscribers.py
+import os
+import time
+import sqlite3
+
+# Legacy hard-coded list; main.py imports these into the repository on each run
+SUBSCRIBERS = []
+
+ACTIVE = "active"
+UNSUBSCRIBED = "unsubscribed"
+BOUNCED = "bounced"
+
+
+class SubscriberRepository:
+    """
+    SQLite-backed subscriber list, indexed by email and by (status, segment),
+    that streams addresses in batches instead of loading them all.
+    """
+
+    def __init__(self, path="data/subscribers.sqlite"):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS subscribers (
+                email TEXT PRIMARY KEY COLLATE NOCASE,
+                status TEXT NOT NULL DEFAULT 'active',
+                segment TEXT NOT NULL DEFAULT 'default',
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_subscribers_status ON subscribers (status, email)"
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_subscribers_status_segment ON subscribers (status, segment, email)"
+        )
+        self.conn.commit()
+
+    def add(self, email, segment="default"):
+        """Add a subscriber. Existing addresses keep their status and segment."""
+        return self.add_many([email], segment)
+
+    def add_many(self, emails, segment="default"):
+        """Add many subscribers at once; returns the number of new rows."""
+        now = time.time()
+        before = self.conn.total_changes
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO subscribers (email, status, segment, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+            [(email.strip(), ACTIVE, segment, now, now) for email in emails if email and email.strip()],
+        )
+        self.conn.commit()
+        return self.conn.total_changes - before
+
+    def set_status(self, email, status):
+        """Set a subscriber's status; returns True if the address exists."""
+        cursor = self.conn.execute(
+            "UPDATE subscribers SET status = ?, updated_at = ? WHERE email = ?",
+            (status, time.time(), email.strip()),
+        )
+        self.conn.commit()
+        return cursor.rowcount > 0
+
+    def unsubscribe(self, email):
+        return self.set_status(email, UNSUBSCRIBED)
+
+    def mark_bounced(self, email):
+        return self.set_status(email, BOUNCED)
+
+    def resubscribe(self, email):
+        return self.set_status(email, ACTIVE)
+
+    def status(self, email):
+        """Return a subscriber's status, or None for an unknown address."""
+        row = self.conn.execute("SELECT status FROM subscribers WHERE email = ?", (email.strip(),)).fetchone()
+        return row[0] if row else None
+
+    def is_active(self, email):
+        return self.status(email) == ACTIVE
+
+    def iter_batches(self, batch_size=1000, status=ACTIVE, segment=None):
+        """
+        Yield lists of email addresses with the given status (and segment),
+        using keyset pagination so each batch is a single indexed range scan.
+        """
+        query = "SELECT email FROM subscribers WHERE status = ? AND email > ?"
+        params = [status]
+        if segment is not None:
+            query += " AND segment = ?"
+        query += " ORDER BY email LIMIT ?"
+
+        last_email = ""
+        while True:
+            args = params + [last_email] + ([segment] if segment is not None else []) + [batch_size]
+            batch = [row[0] for row in self.conn.execute(query, args)]
+            if not batch:
+                return
+            yield batch
+            last_email = batch[-1]
+
+    def iter_emails(self, batch_size=1000, status=ACTIVE, segment=None):
+        """Stream individual addresses, fetched `batch_size` at a time."""
+        for batch in self.iter_batches(batch_size, status, segment):
+            yield from batch
+
+    def count(self, status=ACTIVE, segment=None):
+        query = "SELECT COUNT(*) FROM subscribers WHERE status = ?"
+        params = [status]
+        if segment is not None:
+            query += " AND segment = ?"
+            params.append(segment)
+        return self.conn.execute(query, params).fetchone()[0]
+
+    def close(self):
+        self.conn.close()
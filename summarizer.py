@@ -1,20 +1,36 @@
 # summarizer.py
 import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from langchain import PromptTemplate
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_openai import ChatOpenAI
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.chains.combine_documents import create_stuff_documents_chain
 from langchain.schema import StrOutputParser
+from langchain_core.documents import Document
 from prompts import PROMPTS  # Import the prompts dictionary
+from token_utils import count_tokens, pack_by_tokens
+from utils import log
 
 class SummaryGenerator:
-    def __init__(self, model_type="openai", openai_api_key=None, google_api_key=None):
-        """Initialize with model type and API keys."""
+    def __init__(self, model_type="openai", openai_api_key=None, google_api_key=None, llm=None, cache=None):
+        """
+        Initialize with model type and API keys. A prebuilt chat model can be
+        passed as `llm` (e.g. a local fake model); `model_type` still picks the chain.
+        An optional LLMResponseCache returns identical calls without hitting the model.
+        """
         self.model_type = model_type.lower()
+        self.cache = cache
         self.openai_api_key = openai_api_key or os.getenv("OPENAI_API_KEY")
         self.google_api_key = google_api_key or os.getenv("GOOGLE_API_KEY")
 
+        if llm is not None:
+            if self.model_type not in ("openai", "gemini"):
+                raise ValueError("Unsupported model_type. Use 'openai' or 'gemini'.")
+            self.llm = llm
+            return
+
         if self.model_type == "openai" and not self.openai_api_key:
             raise ValueError("OpenAI API key not provided or found in environment variables.")
         if self.model_type == "gemini" and not self.google_api_key:
@@ -37,8 +53,8 @@ class SummaryGenerator:
         else:
             raise ValueError("Unsupported model_type. Use 'openai' or 'gemini'.")
 
-    def generate_summary(self, documents, prompt_template="v11"):
-        """Generate a summary from preprocessed documents using model-specific chains."""
+    def _build_chain(self, documents, prompt_template):
+        """Return the model-specific (chain, chain_input) pair for a prompt template."""
         # Load prompt from dictionary
         if prompt_template not in PROMPTS:
             raise ValueError(f"Prompt template '{prompt_template}' not found. Available options: {list(PROMPTS.keys())}")
@@ -47,23 +63,218 @@ class SummaryGenerator:
         if self.model_type == "gemini":
             # Gemini-specific chain
             llm_prompt = PromptTemplate.from_template(prompt_text)
-            doc_prompt = PromptTemplate.from_template("{page_content}")
             stuff_chain = (
                 {
                     "context": lambda docs: "\n\n".join(
-                        doc.page_content for doc in documents
+                        doc.page_content for doc in docs
                     )
                 }
                 | llm_prompt
                 | self.llm
                 | StrOutputParser()
             )
-            result = stuff_chain.invoke(documents)
-            return result
-
-        elif self.model_type == "openai":
-            # OpenAI-specific chain
-            prompt = ChatPromptTemplate.from_messages([("system", prompt_text)])
-            chain = create_stuff_documents_chain(self.llm, prompt)
-            result = chain.invoke({"context": documents})
-            return result
\ No newline at end of file
+            return stuff_chain, documents
+
+        # OpenAI-specific chain
+        prompt = ChatPromptTemplate.from_messages([("system", prompt_text)])
+        chain = create_stuff_documents_chain(self.llm, prompt)
+        return chain, {"context": documents}
+
+    def _cache_key(self, prompt_key, context):
+        if self.cache is None:
+            return None
+        model_name = getattr(self.llm, "model_name", None) or getattr(self.llm, "model", None) or type(self.llm).__name__
+        return self.cache.make_key(
+            model_name, getattr(self.llm, "temperature", None), prompt_key, PROMPTS.get(prompt_key), context
+        )
+
+    def _cache_get(self, key):
+        return self.cache.get(key) if key else None
+
+    def _cache_put(self, key, response, prompt_key):
+        if key:
+            self.cache.put(key, response, model_type=self.model_type, prompt=prompt_key)
+
+    def generate_summary(self, documents, prompt_template="v11"):
+        """Generate a summary from preprocessed documents using model-specific chains."""
+        key = self._cache_key(prompt_template, "\n\n".join(doc.page_content for doc in documents))
+        cached = self._cache_get(key)
+        if cached is not None:
+            log(f"Using cached summary for prompt '{prompt_template}'.")
+            return cached
+        chain, chain_input = self._build_chain(documents, prompt_template)
+        result = chain.invoke(chain_input)
+        self._cache_put(key, result, prompt_template)
+        return result
+
+    async def agenerate_summary(self, documents, prompt_template="v11", retry=None):
+        """
+        Async version of generate_summary. An optional llm_runner.RetryPolicy
+        gives the call its own timeout and rate-limit retries.
+        """
+        key = self._cache_key(prompt_template, "\n\n".join(doc.page_content for doc in documents))
+        cached = self._cache_get(key)
+        if cached is not None:
+            log(f"Using cached summary for prompt '{prompt_template}'.")
+            return cached
+        chain, chain_input = self._build_chain(documents, prompt_template)
+        result = await self._acall(lambda: chain.ainvoke(chain_input), retry, f"prompt '{prompt_template}'")
+        self._cache_put(key, result, prompt_template)
+        return result
+
+    def _map_chain(self, map_prompt):
+        if map_prompt not in PROMPTS:
+            raise ValueError(f"Prompt template '{map_prompt}' not found. Available options: {list(PROMPTS.keys())}")
+        return PromptTemplate.from_template(PROMPTS[map_prompt]) | self.llm | StrOutputParser()
+
+    def _cached_map_inputs(self, map_prompt, chunks):
+        """
+        Split map inputs into cached results and pending calls.
+        Returns (contexts, results, keys, pending) where `pending` indexes the calls still to make.
+        """
+        contexts = ["\n\n".join(chunk) for chunk in chunks]
+        keys = [self._cache_key(map_prompt, context) for context in contexts]
+        results = [self._cache_get(key) for key in keys]
+        pending = [i for i, result in enumerate(results) if result is None]
+        return contexts, results, keys, pending
+
+    def _store_map_results(self, map_prompt, results, keys, pending, outputs):
+        """
+        Cache every successful map output, then raise the first failure, so a
+        rerun only repeats the chunks that failed.
+        """
+        failures = []
+        for i, output in zip(pending, outputs):
+            if isinstance(output, Exception):
+                failures.append(output)
+                continue
+            results[i] = output
+            self._cache_put(keys[i], output, map_prompt)
+        if failures:
+            log(f"{len(failures)} of {len(pending)} map calls failed; the others are cached.")
+            raise failures[0]
+        return results
+
+    @staticmethod
+    async def _acall(make_call, retry, label):
+        return await (retry.run(make_call, label) if retry else make_call())
+
+    @staticmethod
+    def _token_counts(documents):
+        """Token count of each document, reusing the count the preprocessor stored in its metadata."""
+        return [doc.metadata.get("tokens") or count_tokens(doc.page_content) for doc in documents]
+
+    @staticmethod
+    def _pack(texts, tokens, chunk_tokens):
+        """Pack texts into chunks of at most `chunk_tokens` using their known token counts."""
+        chunks = pack_by_tokens(list(zip(texts, tokens)), chunk_tokens, count=lambda item: item[1])
+        return [[text for text, _ in chunk] for chunk in chunks]
+
+    def generate_summary_map_reduce(self, documents, prompt_template="v11", chunk_tokens=6000,
+                                    map_prompt="map_v1", max_concurrency=4, max_levels=3):
+        """
+        Summarize weeks too large for a single prompt. Documents are packed into
+        chunks of at most `chunk_tokens` (using the token counts the
+        preprocessor stored in their metadata), each chunk is condensed into notes
+        concurrently with `map_prompt`, and the notes are reduced into the
+        newsletter format of `prompt_template`. Notes that still exceed the
+        budget are condensed again, up to `max_levels` times.
+        """
+        map_chain = self._map_chain(map_prompt)
+        texts = [doc.page_content for doc in documents]
+        tokens = self._token_counts(documents)
+        if sum(tokens) <= chunk_tokens:
+            return self.generate_summary(documents, prompt_template)
+
+        for level in range(1, max_levels + 1):
+            chunks = self._pack(texts, tokens, chunk_tokens)
+            log(f"Map-reduce level {level}: summarizing {len(texts)} documents in {len(chunks)} chunks...")
+            contexts, results, keys, pending = self._cached_map_inputs(map_prompt, chunks)
+            outputs = map_chain.batch(
+                [{"context": contexts[i]} for i in pending],
+                config={"max_concurrency": max_concurrency},
+                return_exceptions=True,
+            ) if pending else []
+            texts = self._store_map_results(map_prompt, results, keys, pending, outputs)
+            tokens = [count_tokens(text) for text in texts]
+            if len(chunks) == 1 or sum(tokens) <= chunk_tokens:
+                break
+
+        log(f"Reducing {len(texts)} partial summaries with prompt '{prompt_template}'...")
+        return self.generate_summary([Document(page_content=text) for text in texts], prompt_template)
+
+    async def agenerate_summary_map_reduce(self, documents, prompt_template="v11", chunk_tokens=6000,
+                                           map_prompt="map_v1", max_concurrency=4, max_levels=3, retry=None):
+        """
+        Async version of generate_summary_map_reduce. With `retry`, each map
+        call is timed out and retried on its own.
+        """
+        map_chain = self._map_chain(map_prompt)
+        texts = [doc.page_content for doc in documents]
+        tokens = self._token_counts(documents)
+        if sum(tokens) <= chunk_tokens:
+            return await self.agenerate_summary(documents, prompt_template, retry)
+
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def map_call(context, label):
+            async with semaphore:
+                return await self._acall(lambda: map_chain.ainvoke({"context": context}), retry, label)
+
+        for level in range(1, max_levels + 1):
+            chunks = self._pack(texts, tokens, chunk_tokens)
+            log(f"Map-reduce level {level}: summarizing {len(texts)} documents in {len(chunks)} chunks...")
+            contexts, results, keys, pending = self._cached_map_inputs(map_prompt, chunks)
+            outputs = await asyncio.gather(
+                *(map_call(contexts[i], f"map chunk {i + 1}/{len(chunks)}") for i in pending),
+                return_exceptions=True,
+            )
+            texts = self._store_map_results(map_prompt, results, keys, pending, outputs)
+            tokens = [count_tokens(text) for text in texts]
+            if len(chunks) == 1 or sum(tokens) <= chunk_tokens:
+                break
+
+        log(f"Reducing {len(texts)} partial summaries with prompt '{prompt_template}'...")
+        return await self.agenerate_summary([Document(page_content=text) for text in texts], prompt_template, retry)
+
+    @staticmethod
+    def _section_documents(topics, drafts):
+        return [
+            Document(page_content=f"## {topic}\n\n{draft}", metadata={"topic": topic})
+            for topic, draft in zip(topics, drafts)
+        ]
+
+    def generate_summary_by_topic(self, sections, prompt_template="v11", section_prompt="section_v1",
+                                  chunk_tokens=6000, max_concurrency=4):
+        """
+        Summarize each topic in `sections` ({topic: [Documents]}, e.g. from
+        TopicClusterer) into a draft section with `section_prompt`, in parallel
+        and with smaller prompts, then merge the drafts into the newsletter
+        format of `prompt_template`.
+        """
+        topics = list(sections)
+        log(f"Summarizing {len(topics)} topic sections with prompt '{section_prompt}'...")
+        with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+            drafts = list(pool.map(
+                lambda topic: self.generate_summary_map_reduce(
+                    sections[topic], prompt_template=section_prompt, chunk_tokens=chunk_tokens
+                ),
+                topics,
+            ))
+        return self.generate_summary(self._section_documents(topics, drafts), prompt_template)
+
+    async def agenerate_summary_by_topic(self, sections, prompt_template="v11", section_prompt="section_v1",
+                                         chunk_tokens=6000, max_concurrency=4, retry=None):
+        """Async version of generate_summary_by_topic."""
+        topics = list(sections)
+        log(f"Summarizing {len(topics)} topic sections with prompt '{section_prompt}'...")
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def draft(topic):
+            async with semaphore:
+                return await self.agenerate_summary_map_reduce(
+                    sections[topic], prompt_template=section_prompt, chunk_tokens=chunk_tokens, retry=retry
+                )
+
+        drafts = await asyncio.gather(*(draft(topic) for topic in topics))
+        return await self.agenerate_summary(self._section_documents(topics, drafts), prompt_template, retry)
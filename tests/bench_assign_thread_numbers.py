@@ -0,0 +1,57 @@
+"""
+Benchmark assign_thread_numbers against the original loop on the weekly
+exports in data/: each CSV as it is, then all of them together replicated
+to larger sizes. Synthetic timelines follow as an extra.
+
+    python tests/bench_assign_thread_numbers.py
+"""
+import glob
+import os
+import sys
+import timeit
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from test_utils import DATA_DIR, assign_thread_numbers_loop, load_week, synthetic_tweets  # noqa: E402
+from tweet_store import normalize_dates  # noqa: E402
+from utils import assign_thread_numbers  # noqa: E402
+
+REPLICAS = (1, 10, 50)
+SYNTHETIC_ROWS = (1_000, 10_000, 100_000)
+
+
+def best_ms(function, df, repeat=5):
+    return min(timeit.repeat(lambda: function(df.copy()), number=1, repeat=repeat)) * 1000
+
+
+def replicate(df, times):
+    """`times` copies of `df`, each under its own author names so threads stay separate."""
+    return pd.concat(
+        [df.assign(author_name=df["author_name"] + f"#{copy}") for copy in range(times)],
+        ignore_index=True,
+    )
+
+
+def report(label, df):
+    loop = best_ms(assign_thread_numbers_loop, df, repeat=1 if len(df) > 10_000 else 3)
+    vectorized = best_ms(assign_thread_numbers, df)
+    print(f"{label:<32} {len(df):>8} {loop:>10.1f} {vectorized:>14.1f} {loop / vectorized:>7.0f}x")
+
+
+if __name__ == "__main__":
+    print(f"{'input':<32} {'rows':>8} {'loop ms':>10} {'vectorized ms':>14} {'speedup':>8}")
+    weeks = []
+    for path in sorted(glob.glob(os.path.join(DATA_DIR, "*.csv"))):
+        week = load_week(path).dropna(subset=["author_name", "date", "time"])
+        report(os.path.basename(path), week)
+        # One export uses DD-MM-YYYY; combined, the dates must share a format
+        weeks.append(week.assign(date=normalize_dates(week["date"])))
+
+    all_weeks = pd.concat(weeks, ignore_index=True)
+    for times in REPLICAS:
+        report(f"all exports x{times}", replicate(all_weeks, times))
+
+    for rows in SYNTHETIC_ROWS:
+        report("synthetic", synthetic_tweets(rows, n_authors=max(40, rows // 100)))
@@ -0,0 +1,24 @@
+import os
+import sys
+
+import pytest
+
+# The project is a flat set of modules at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def chrome():
+    """A headless Chrome session; tests using it are skipped where Chrome is unavailable."""
+    from selenium import webdriver
+    from selenium.common.exceptions import WebDriverException
+
+    options = webdriver.ChromeOptions()
+    for argument in ("--headless=new", "--no-sandbox", "--disable-dev-shm-usage"):
+        options.add_argument(argument)
+    try:
+        driver = webdriver.Chrome(options=options)
+    except (WebDriverException, OSError) as e:
+        pytest.skip(f"Chrome is not available: {e.__class__.__name__}")
+    yield driver
+    driver.quit()
@@ -0,0 +1,119 @@
+"""
+Scriptable stand-ins for a Chrome WebDriver showing an X list timeline. They
+answer the scraper's scripts (wait, batch extraction, skip-seen) from a fixed
+list of tweets, and can be killed mid-run like a crashed browser.
+"""
+from datetime import datetime, timedelta
+
+from selenium.common.exceptions import TimeoutException
+from urllib3.exceptions import MaxRetryError, NewConnectionError
+
+from tweet_extractor import EXTRACT_TWEETS_JS, SKIP_SEEN_TWEETS_JS
+from waits import WAIT_FOR_TWEET_JS
+
+
+def make_timeline(n, newest=datetime(2025, 3, 6, 12, 0), old_tail=3):
+    """`n` tweets newest first, one minute apart, followed by `old_tail` tweets from a month earlier."""
+    tweets = []
+    for i in range(n + old_tail):
+        stamp = newest - timedelta(minutes=i) if i < n else newest - timedelta(days=30, minutes=i)
+        tweets.append({
+            "author_details": f"Author {i % 7}\n@author{i % 7}",
+            "datetime": stamp.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+            "text": f"tweet number {i}",
+            "lang": "en",
+            "tweet_url": f"https://x.com/author{i % 7}/status/{10_000 - i}",
+            "mentioned_urls": [],
+            "is_reposted": False,
+            "has_video": False,
+            "has_photo": False,
+            "image_urls": [],
+        })
+    return tweets
+
+
+class FakeTimelineDriver:
+    """
+    Serves `timeline` in pages as the real list page would. After
+    `kill_after_batches` extraction calls the browser dies: every later call
+    raises the connection error selenium raises once chromedriver is gone.
+    """
+
+    def __init__(self, timeline, kill_after_batches=None, name="driver"):
+        self.timeline = timeline
+        self.kill_after_batches = kill_after_batches
+        self.name = name
+        self.position = 0
+        self.batches = 0
+        self.killed = False
+        self.quit_called = False
+        self.pages_loaded = 0
+
+    def kill(self):
+        self.killed = True
+
+    def _check_alive(self):
+        if self.killed:
+            raise MaxRetryError(None, "/session/fake/execute/sync",
+                                NewConnectionError(None, "Failed to establish a new connection: [Errno 111]"))
+
+    def get(self, url):
+        self._check_alive()
+        self.position = 0
+        self.pages_loaded += 1
+
+    def set_script_timeout(self, timeout):
+        self._check_alive()
+
+    def execute_async_script(self, script, *args):
+        self._check_alive()
+        if script == WAIT_FOR_TWEET_JS:
+            if self.position >= len(self.timeline):
+                raise TimeoutException("script timeout")
+            return True
+        if script == SKIP_SEEN_TWEETS_JS:
+            seen, skipped = set(args[0]), 0
+            while self.position < len(self.timeline):
+                tweet_id = self.timeline[self.position]["tweet_url"].rsplit("/", 1)[1]
+                if tweet_id not in seen:
+                    break
+                self.position += 1
+                skipped += 1
+            return {"skipped": skipped, "found": self.position < len(self.timeline)}
+        raise AssertionError("unexpected async script")
+
+    def execute_script(self, script, *args):
+        self._check_alive()
+        if script == EXTRACT_TWEETS_JS:
+            limit = args[0] or len(self.timeline)
+            batch = self.timeline[self.position:self.position + limit]
+            self.position += len(batch)
+            self.batches += 1
+            if self.kill_after_batches is not None and self.batches >= self.kill_after_batches:
+                self.kill()
+            return batch
+        return None  # Scrolling, garbage collection
+
+    def quit(self):
+        self.quit_called = True
+
+
+class FakeDriverManager:
+    """A WebDriverManager whose restarts hand out the next driver from `drivers`."""
+
+    def __init__(self, drivers):
+        self.drivers = list(drivers)
+        self.driver = self.drivers.pop(0)
+        self.restarts = 0
+        self.pool = None
+
+    def restart_driver(self):
+        self.restarts += 1
+        self.driver.quit()
+        self.driver = self.drivers.pop(0)
+
+    def heap_usage_mb(self):
+        return 0.0
+
+    def close(self):
+        self.driver.quit()
@@ -0,0 +1,113 @@
+"""A minimal in-process SMTP server for tests, with scriptable failures."""
+import socketserver
+import threading
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode("ascii"))
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        self.reply("220 localhost test SMTP")
+        sender, recipients = None, []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode("utf-8", "replace").strip()
+            verb = command.split(" ", 1)[0].upper()
+            if verb in ("EHLO", "HELO"):
+                self.reply("250-localhost" if verb == "EHLO" else "250 localhost")
+                if verb == "EHLO":
+                    self.reply("250-AUTH PLAIN LOGIN")
+                    self.reply("250 8BITMIME")
+            elif verb == "AUTH":
+                if server.auth_code:
+                    self.reply(f"{server.auth_code} Authentication credentials invalid")
+                else:
+                    self.reply("235 Authentication successful")
+            elif verb == "MAIL":
+                if server.sender_code:
+                    self.reply(f"{server.sender_code} Sender refused")
+                    continue
+                sender, recipients = command.split(":", 1)[1].strip(" <>"), []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                recipient = command.split(":", 1)[1].strip(" <>")
+                code = server.refuse.get(recipient)
+                if code:
+                    self.reply(f"{code} Recipient refused")
+                else:
+                    recipients.append(recipient)
+                    self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = []
+                while True:
+                    chunk = self.rfile.readline()
+                    if not chunk or chunk in (b".\r\n", b".\n"):
+                        break
+                    data.append(chunk)
+                with server.lock:
+                    drop = server.drop_after is not None and server.accepted >= server.drop_after
+                    if drop:
+                        server.drop_after = None
+                if drop:
+                    return  # Hang up mid-transaction, as a server dropping the session would
+                if server.data_code:
+                    self.reply(f"{server.data_code} Message rejected")
+                    continue
+                with server.lock:
+                    server.accepted += 1
+                    server.messages.append((sender, recipients, b"".join(data)))
+                self.reply("250 OK queued")
+            elif verb == "RSET" or verb == "NOOP":
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class SMTPServer(socketserver.ThreadingTCPServer):
+    """
+    Accepts every message unless told otherwise:
+    - refuse: {recipient: code} replies to RCPT TO
+    - auth_code / sender_code / data_code: reply code for AUTH / MAIL FROM / DATA
+    - drop_after: hang up once this many messages have been accepted
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), SMTPHandler)
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.accepted = 0
+        self.messages = []
+        self.refuse = {}
+        self.auth_code = None
+        self.sender_code = None
+        self.data_code = None
+        self.drop_after = None
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def recipients(self):
+        return [recipient for _, recipients, _ in self.messages for recipient in recipients]
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
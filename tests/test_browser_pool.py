@@ -0,0 +1,96 @@
+import time
+
+import pytest
+
+from browser_pool import BrowserPool
+from fake_browser import FakeTimelineDriver, make_timeline
+from twitter_scraper import TwitterScraper
+from webdriver_manager import WebDriverManager
+
+LIST_URL = "https://x.com/i/lists/1"
+
+
+class FakeLaunchManager(WebDriverManager):
+    """A real WebDriverManager whose launch hands out the pool's next fake driver."""
+
+    def initialize_driver(self):
+        self.driver = self.pool.next_driver(self.user_data_dir)
+
+
+class FakePool(BrowserPool):
+    """A BrowserPool launching fake browsers; `launches` lists a driver or an exception per launch."""
+
+    def __init__(self, tmp_path, launches, **kwargs):
+        super().__init__("user", "secret", profile_root=str(tmp_path / "profiles"), cookie_path=None, **kwargs)
+        self.launches = list(launches)
+        self.launched = []
+
+    def _new_manager(self, profile_dir):
+        return FakeLaunchManager(self.username, self.password, cookie_path=None, user_data_dir=profile_dir, pool=self)
+
+    def next_driver(self, profile_dir):
+        launch = self.launches.pop(0)
+        if isinstance(launch, Exception):
+            raise launch
+        self.launched.append((launch.name, profile_dir))
+        return launch
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_killed_browser_is_swapped_for_a_warm_spare(tmp_path):
+    timeline = make_timeline(95)
+    first = FakeTimelineDriver(timeline, kill_after_batches=2, name="first")
+    spare = FakeTimelineDriver(timeline, name="spare")
+    recycled = FakeTimelineDriver(timeline, name="recycled")
+    pool = FakePool(tmp_path, [first, spare, recycled], spares=1, launch_timeout=5)
+    try:
+        manager = pool.start().acquire()
+        assert manager.driver is first
+
+        scraper = TwitterScraper(manager, seen_dir=str(tmp_path / "seen"))
+        df = scraper.fetch_tweets_list_batched(LIST_URL, "2025-03-01", "2025-03-07", batch_size=20)
+
+        assert len(df) == 95 and df["tweet_url"].is_unique
+        assert manager.driver is spare and first.quit_called
+        # The crashed browser's profile is relaunched as the next spare
+        assert wait_until(lambda: pool._ready.qsize() == 1)
+        profiles = dict(pool.launched)
+        assert profiles["recycled"] == profiles["first"] != manager.user_data_dir
+    finally:
+        pool.close()
+
+
+def test_failed_background_launch_does_not_hang_acquire(tmp_path):
+    pool = FakePool(tmp_path, [RuntimeError("chrome failed to start"), RuntimeError("login page changed")],
+                    spares=1, launch_timeout=0.2)
+    try:
+        pool.start()
+        started = time.monotonic()
+        with pytest.raises(RuntimeError, match="login page changed"):
+            pool.acquire()
+        assert time.monotonic() - started < 5
+        # Failed launches give their profile slots back
+        assert not pool._locks
+    finally:
+        pool.close()
+
+
+def test_swap_without_spares_relaunches_inline_and_surfaces_errors(tmp_path):
+    timeline = make_timeline(5)
+    first = FakeTimelineDriver(timeline, name="first")
+    second = FakeTimelineDriver(timeline, name="second")
+    pool = FakePool(tmp_path, [first, second, RuntimeError("chrome failed to start")], spares=0)
+    try:
+        manager = pool.acquire()
+        manager.restart_driver()
+        assert manager.driver is second and first.quit_called
+        with pytest.raises(RuntimeError, match="chrome failed to start"):
+            manager.restart_driver()
+    finally:
+        pool.close()
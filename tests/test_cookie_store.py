@@ -0,0 +1,69 @@
+import os
+import threading
+
+from cookie_store import CookieStore
+from webdriver_manager import WebDriverManager
+
+COOKIES = [{"name": "auth_token", "value": "secret-token", "domain": ".x.com", "path": "/"}]
+
+
+def test_roundtrip_is_encrypted_and_private(tmp_path):
+    path = str(tmp_path / "cookies.bin")
+    CookieStore(path, "password").save(COOKIES)
+    assert CookieStore(path, "password").load() == COOKIES
+    assert b"secret-token" not in open(path, "rb").read()
+    assert os.stat(path).st_mode & 0o777 == 0o600
+    assert CookieStore(path, "another password").load() is None
+
+
+def test_concurrent_saves_do_not_collide(tmp_path):
+    path = str(tmp_path / "cookies.bin")
+    errors = []
+
+    def save(worker):
+        store = CookieStore(path, "password")
+        for i in range(10):
+            try:
+                store.save([{"name": "auth_token", "value": f"{worker}-{i}"}])
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=save, args=(worker,)) for worker in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert os.listdir(tmp_path) == ["cookies.bin"]
+    assert CookieStore(path, "password").load()[0]["value"].endswith("-9")
+
+
+def test_clear_twice(tmp_path):
+    store = CookieStore(str(tmp_path / "cookies.bin"), "password")
+    store.save(COOKIES)
+    store.clear()
+    store.clear()
+    assert store.load() is None
+
+
+class BrokenCDPDriver:
+    """A browser whose DevTools commands fail, as after a crashed renderer."""
+
+    def __init__(self):
+        self.visited = []
+
+    def execute_cdp_cmd(self, command, params):
+        raise RuntimeError(f"{command} failed")
+
+    def get(self, url):
+        self.visited.append(url)
+
+
+def test_restore_failure_falls_back_to_login(tmp_path):
+    path = str(tmp_path / "cookies.bin")
+    CookieStore(path, "password").save(COOKIES)
+    manager = WebDriverManager("user", "password", cookie_path=path)
+    manager.driver = BrokenCDPDriver()
+    assert manager._restore_session() is False
+    # The cookies are kept for the next launch
+    assert CookieStore(path, "password").load() == COOKIES
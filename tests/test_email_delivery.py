@@ -0,0 +1,125 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from email_delivery import DeliveryAborted, RetryQueue, deliver
+from email_sender import SMTPConnection, render_newsletter
+from smtp_server import SMTPServer
+from subscribers import SubscriberRepository
+
+SUMMARIES = {"Last Week": "**AI this week**\n\n- A new model"}
+
+
+@pytest.fixture
+def server():
+    with SMTPServer() as server:
+        yield server
+
+
+@pytest.fixture
+def repo(tmp_path):
+    repo = SubscriberRepository(str(tmp_path / "subscribers.sqlite"))
+    yield repo
+    repo.close()
+
+
+def run_delivery(server, subscribers, **kwargs):
+    newsletter = render_newsletter(SUMMARIES, "digest@example.com")
+    kwargs.setdefault("rate", 0)
+    kwargs.setdefault("base_delay", 0)
+    return asyncio.run(deliver(
+        newsletter,
+        subscribers,
+        lambda: SMTPConnection(host="127.0.0.1", port=server.port, use_tls=False, timeout=5,
+                               sender="digest@example.com"),
+        **kwargs,
+    ))
+
+
+def test_delivers_to_every_subscriber(server):
+    subscribers = [f"user{i}@example.com" for i in range(10)]
+    report = run_delivery(server, iter(subscribers), concurrency=3)
+    assert sorted(report.sent) == sorted(subscribers)
+    assert sorted(server.recipients()) == sorted(subscribers)
+
+
+def test_transient_failures_are_queued_and_retried_next_run(server, tmp_path):
+    path = str(tmp_path / "retry.json")
+    server.refuse["slow@example.com"] = 451
+    report = run_delivery(server, ["a@example.com", "slow@example.com"], retry_queue=RetryQueue(path), max_attempts=2)
+    assert report.deferred.keys() == {"slow@example.com"}
+    assert json.load(open(path))["slow@example.com"]["attempts"] == 1
+
+    server.refuse.clear()
+    report = run_delivery(server, ["a@example.com"], retry_queue=RetryQueue(path))
+    assert sorted(report.sent) == ["a@example.com", "slow@example.com"]
+    assert json.load(open(path)) == {}
+
+
+def test_queued_retries_skip_unsubscribed_and_bounced(server, tmp_path, repo):
+    repo.add_many(["a@example.com", "gone@example.com", "bounced@example.com", "queued@example.com"])
+    repo.unsubscribe("gone@example.com")
+    repo.mark_bounced("bounced@example.com")
+    queue = RetryQueue(str(tmp_path / "retry.json"))
+    for subscriber in ("gone@example.com", "bounced@example.com", "queued@example.com"):
+        queue.add(subscriber, "451 try later")
+
+    report = run_delivery(server, repo.iter_emails(), retry_queue=queue, is_subscribed=repo.is_active)
+
+    assert sorted(report.sent) == ["a@example.com", "queued@example.com"]
+    assert "gone@example.com" not in server.recipients()
+    assert "bounced@example.com" not in server.recipients()
+    assert queue.entries == {}
+
+
+def test_retry_queue_gives_up_after_attempt_or_age_limit(tmp_path):
+    queue = RetryQueue(str(tmp_path / "retry.json"), max_attempts=3, max_age=3600)
+    for _ in range(3):
+        queue.add("tired@example.com", "451")
+    queue.add("old@example.com", "451")
+    queue.entries["old@example.com"]["queued_at"] = time.time() - 7200
+    queue.add("fresh@example.com", "451")
+    first_queued = queue.entries["fresh@example.com"]["queued_at"]
+    queue.add("fresh@example.com", "451")
+
+    assert queue.due() == ["fresh@example.com"]
+    # Re-queueing keeps the original queue time, so the age limit still applies
+    assert queue.entries["fresh@example.com"]["queued_at"] == first_queued
+
+
+def test_only_refused_recipients_count_as_bounces(server):
+    server.refuse["gone@example.com"] = 550
+    server.refuse["later@example.com"] = 450
+    report = run_delivery(server, ["a@example.com", "gone@example.com", "later@example.com"], max_attempts=1)
+    assert report.bounced.keys() == {"gone@example.com"}
+    assert report.failed == {}
+    assert report.deferred.keys() == {"later@example.com"}
+
+
+def test_content_rejection_is_a_failure_not_a_bounce(server):
+    server.data_code = 552
+    report = run_delivery(server, ["a@example.com", "b@example.com"])
+    assert report.bounced == {}
+    assert report.failed.keys() == {"a@example.com", "b@example.com"}
+
+
+@pytest.mark.parametrize("setting", ["auth_code", "sender_code"])
+def test_auth_and_sender_errors_abort_the_delivery(server, setting):
+    setattr(server, setting, 535 if setting == "auth_code" else 553)
+    subscribers = [f"user{i}@example.com" for i in range(50)]
+    newsletter = render_newsletter(SUMMARIES, "digest@example.com")
+    with pytest.raises(DeliveryAborted) as aborted:
+        asyncio.run(deliver(
+            newsletter,
+            iter(subscribers),
+            lambda: SMTPConnection("digest@example.com", "wrong", host="127.0.0.1", port=server.port,
+                                   use_tls=False, timeout=5),
+            concurrency=3, rate=0, base_delay=0,
+        ))
+    report = aborted.value.report
+    assert report.aborted
+    assert report.bounced == {} and report.failed == {} and report.sent == []
+    # Workers stop at the first fatal error instead of trying every subscriber
+    assert server.connections <= 3
@@ -0,0 +1,69 @@
+import smtplib
+
+import pytest
+
+from email_sender import SMTPConnection, render_newsletter, send_bulk_email
+from smtp_server import SMTPServer
+
+SUMMARIES = {"Last Week": "**AI this week**\n\n- A new model\n- A new paper"}
+
+
+@pytest.fixture
+def server():
+    with SMTPServer() as server:
+        yield server
+
+
+def connection(server, **kwargs):
+    kwargs.setdefault("sender", "digest@example.com")
+    return SMTPConnection(host="127.0.0.1", port=server.port, use_tls=False, timeout=5, **kwargs)
+
+
+def test_one_connection_is_reused_and_recycled(server):
+    subscribers = [f"user{i}@example.com" for i in range(7)]
+    with connection(server, max_messages=3) as smtp:
+        results = send_bulk_email(SUMMARIES, subscribers, smtp)
+    assert results == {subscriber: None for subscriber in subscribers}
+    assert server.recipients() == subscribers
+    assert server.connections == 3  # 3 + 3 + 1 messages
+
+
+def test_login_runs_once_per_connection(server):
+    with connection(server, username="digest@example.com", password="secret") as smtp:
+        send_bulk_email(SUMMARIES, ["a@example.com", "b@example.com"], smtp)
+    assert server.connections == 1 and len(server.messages) == 2
+
+
+def test_dropped_connection_is_reopened_and_message_resent_once(server):
+    server.drop_after = 2
+    subscribers = [f"user{i}@example.com" for i in range(4)]
+    with connection(server) as smtp:
+        results = send_bulk_email(SUMMARIES, subscribers, smtp)
+    assert all(error is None for error in results.values())
+    assert server.recipients() == subscribers
+    assert server.connections == 2
+
+
+def test_rejections_are_not_resent(server):
+    server.refuse["bad@example.com"] = 550
+    with connection(server) as smtp:
+        results = send_bulk_email(SUMMARIES, ["a@example.com", "bad@example.com", "b@example.com"], smtp)
+    assert results["bad@example.com"] and results["a@example.com"] is None and results["b@example.com"] is None
+    assert server.recipients() == ["a@example.com", "b@example.com"]
+    assert server.connections == 1  # No reconnect after a refusal
+
+
+def test_data_rejection_raises_without_resend(server):
+    server.data_code = 554
+    with connection(server) as smtp:
+        with pytest.raises(smtplib.SMTPDataError):
+            smtp.send("a@example.com", b"Subject: x\r\n\r\nbody\r\n")
+    assert server.connections == 1 and server.messages == []
+
+
+def test_rendered_message_is_stamped_per_recipient():
+    newsletter = render_newsletter(SUMMARIES, "digest@example.com")
+    first, second = newsletter.message_for("a@example.com"), newsletter.message_for("b@example.com")
+    assert first.startswith(b"To: a@example.com\r\n") and second.startswith(b"To: b@example.com\r\n")
+    assert first.endswith(newsletter.body) and second.endswith(newsletter.body)
+    assert b"AI this week" in newsletter.body
@@ -0,0 +1,35 @@
+import json
+
+import numpy as np
+
+from embedding_store import EmbeddingStore
+
+
+def test_orphan_vector_from_a_crash_does_not_shift_later_rows(tmp_path):
+    store = EmbeddingStore(str(tmp_path))
+    store.add(["a"], np.array([[1, 0, 0]]))
+    # Crash between writing a vector and its index line
+    with open(store.vectors_path, "ab") as f:
+        f.write(np.array([[9, 9, 9]], dtype=np.float32).tobytes())
+
+    store = EmbeddingStore(str(tmp_path))
+    store.add(["b"], np.array([[0, 1, 0]]))
+
+    reopened = EmbeddingStore(str(tmp_path))
+    assert reopened.rows == {"a": 0, "b": 1}
+    np.testing.assert_array_equal(reopened.vectors(), [[1, 0, 0], [0, 1, 0]])
+
+
+def test_index_lines_without_vectors_are_dropped(tmp_path):
+    store = EmbeddingStore(str(tmp_path))
+    store.add(["a"], np.array([[1, 0, 0]]))
+    with open(store.index_path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"key": "orphan"}) + "\n" + '{"key": "cut')
+
+    store = EmbeddingStore(str(tmp_path))
+    assert store.rows == {"a": 0}
+    store.add(["b"], np.array([[0, 1, 0]]))
+
+    reopened = EmbeddingStore(str(tmp_path))
+    assert reopened.rows == {"a": 0, "b": 1}
+    np.testing.assert_array_equal(reopened.vectors(), [[1, 0, 0], [0, 1, 0]])
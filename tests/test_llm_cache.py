@@ -0,0 +1,43 @@
+import os
+import threading
+
+from llm_cache import LLMResponseCache
+
+
+def test_roundtrip_and_normalized_key(tmp_path):
+    cache = LLMResponseCache(str(tmp_path))
+    key = cache.make_key("model", 0, "v11", "prompt", "a  \r\nb ")
+    assert key == cache.make_key("model", 0, "v11", "prompt", "a\nb")
+    assert cache.get(key) is None
+    cache.put(key, "summary", prompt="v11")
+    assert cache.get(key) == "summary"
+    assert cache.stats() == {"hits": 1, "misses": 1}
+
+
+def test_eviction_keeps_the_cache_under_its_size_bound(tmp_path):
+    cache = LLMResponseCache(str(tmp_path), max_bytes=2000)
+    for i in range(50):
+        cache.put(cache.make_key("m", 0, "p", "x", str(i)), "r" * 100)
+    assert sum(os.path.getsize(tmp_path / name) for name in os.listdir(tmp_path)) <= 2000
+
+
+def test_concurrent_puts_and_evictions_do_not_race(tmp_path):
+    cache = LLMResponseCache(str(tmp_path), max_bytes=3000)
+    errors = []
+
+    def work():
+        try:
+            for i in range(200):
+                key = cache.make_key("m", 0, "p", "x", str(i % 20))
+                cache.put(key, "r" * 100)
+                cache.get(key)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
@@ -0,0 +1,15 @@
+import pandas as pd
+
+from relevance import load_history
+
+
+def test_history_excludes_the_ranked_week_in_either_date_format(tmp_path):
+    pd.DataFrame({
+        "text": ["old export tweet", "ranked week tweet"],
+        "date": ["20-02-2025", "28-02-2025"],
+    }).to_csv(tmp_path / "tweets_week_0222-0301.csv", index=False)
+    pd.DataFrame({"text": ["new export tweet"], "date": ["2025-02-28"]}).to_csv(tmp_path / "latest.csv", index=False)
+
+    history = load_history(str(tmp_path), exclude_dates=["2025-02-28"])
+
+    assert history.to_dict("records") == [{"text": "old export tweet", "date": "2025-02-20"}]
@@ -0,0 +1,152 @@
+import asyncio
+import threading
+
+import pytest
+from langchain_core.documents import Document
+from langchain_core.runnables import RunnableLambda
+
+from llm_cache import LLMResponseCache
+from llm_runner import summarize_all
+from summarizer import SummaryGenerator
+from token_utils import count_tokens, pack_by_tokens
+
+
+class FakeLLM:
+    """Records every prompt and answers map prompts with short notes, anything else with a digest."""
+
+    def __init__(self, rate_limit_once=None):
+        self.prompts = []
+        self.rate_limit_once = rate_limit_once  # Text whose first prompt gets a 429
+        self._lock = threading.Lock()
+        self.runnable = RunnableLambda(self._respond)
+
+    def _respond(self, prompt_value):
+        prompt = prompt_value.to_string()
+        with self._lock:
+            self.prompts.append(prompt)
+            n = len(self.prompts)
+            if self.rate_limit_once and self.rate_limit_once in prompt:
+                self.rate_limit_once = None
+                raise RuntimeError("429 Too Many Requests")
+        if "one batch of tweets" in prompt:
+            return f"notes {n}"
+        if "cover one topic" in prompt:
+            return f"section {n}"
+        return "DIGEST"
+
+    def calls(self, marker):
+        return [prompt for prompt in self.prompts if marker in prompt]
+
+
+@pytest.fixture
+def llm():
+    return FakeLLM()
+
+
+def make_summarizer(llm, cache=None):
+    return SummaryGenerator(model_type="gemini", llm=llm.runnable, cache=cache)
+
+
+def make_documents(n, words=60):
+    return [Document(page_content=f"thread {i}: " + " ".join(f"word{i}_{j}" for j in range(words)))
+            for i in range(n)]
+
+
+def test_small_week_is_summarized_in_one_call(llm):
+    documents = make_documents(3)
+    assert make_summarizer(llm).generate_summary_map_reduce(documents, chunk_tokens=100_000) == "DIGEST"
+    assert len(llm.prompts) == 1
+    assert all(doc.page_content in llm.prompts[0] for doc in documents)
+
+
+def test_map_reduce_maps_each_chunk_then_reduces_the_notes(llm):
+    documents = make_documents(40)
+    chunk_tokens = 4 * count_tokens(documents[0].page_content)
+    expected_chunks = pack_by_tokens([doc.page_content for doc in documents], chunk_tokens)
+
+    result = make_summarizer(llm).generate_summary_map_reduce(documents, chunk_tokens=chunk_tokens)
+
+    map_calls = llm.calls("one batch of tweets")
+    assert result == "DIGEST"
+    assert len(map_calls) == len(expected_chunks) > 1
+    # Every thread reaches exactly one map call, whole
+    for doc in documents:
+        assert sum(doc.page_content in prompt for prompt in map_calls) == 1
+    reduce_call = llm.prompts[-1]
+    assert "one batch of tweets" not in reduce_call
+    assert sum("notes " in line for line in reduce_call.splitlines()) == len(expected_chunks)
+
+
+def test_map_reduce_reuses_preprocessed_token_counts(llm, monkeypatch):
+    documents = make_documents(40)
+    for doc in documents:
+        doc.metadata["tokens"] = 10
+    counted = []
+    monkeypatch.setattr("summarizer.count_tokens", lambda text: counted.append(text) or count_tokens(text))
+
+    make_summarizer(llm).generate_summary_map_reduce(documents, chunk_tokens=40)
+
+    # Packing follows the stored counts; only the map notes are counted
+    assert len(llm.calls("one batch of tweets")) == 10
+    assert not any(doc.page_content in counted for doc in documents)
+
+
+def test_async_map_reduce_matches_sync(llm):
+    documents = make_documents(40)
+    chunk_tokens = 4 * count_tokens(documents[0].page_content)
+    result = asyncio.run(make_summarizer(llm).agenerate_summary_map_reduce(documents, chunk_tokens=chunk_tokens))
+    assert result == "DIGEST"
+    assert len(llm.calls("one batch of tweets")) == len(
+        pack_by_tokens([doc.page_content for doc in documents], chunk_tokens)
+    )
+
+
+def test_cached_map_reduce_makes_no_calls(llm, tmp_path):
+    documents = make_documents(40)
+    chunk_tokens = 4 * count_tokens(documents[0].page_content)
+    cache = LLMResponseCache(str(tmp_path / "llm"))
+    first = make_summarizer(llm, cache).generate_summary_map_reduce(documents, chunk_tokens=chunk_tokens)
+    calls = len(llm.prompts)
+    second = make_summarizer(llm, cache).generate_summary_map_reduce(documents, chunk_tokens=chunk_tokens)
+    assert first == second == "DIGEST"
+    assert len(llm.prompts) == calls
+
+
+def test_topic_sections_are_drafted_then_merged(llm):
+    sections = {"agents": make_documents(3), "models": make_documents(2)}
+    result = make_summarizer(llm).generate_summary_by_topic(sections, chunk_tokens=100_000)
+    assert result == "DIGEST"
+    assert len(llm.calls("cover one topic")) == 2
+    assert "## agents" in llm.prompts[-1] and "## models" in llm.prompts[-1]
+
+
+def test_rate_limited_map_call_is_retried_alone():
+    documents = make_documents(40)
+    chunk_tokens = 4 * count_tokens(documents[0].page_content)
+    chunks = pack_by_tokens([doc.page_content for doc in documents], chunk_tokens)
+    llm = FakeLLM(rate_limit_once=documents[-1].page_content)
+
+    summaries = summarize_all({"week": (make_summarizer(llm), "v11")}, documents,
+                              chunk_tokens=chunk_tokens, base_delay=0)
+
+    assert summaries == {"week": "DIGEST"}
+    map_calls = llm.calls("one batch of tweets")
+    # Only the rate-limited chunk is sent twice
+    assert len(map_calls) == len(chunks) + 1
+    for doc in documents:
+        expected = 2 if doc.page_content in chunks[-1] else 1
+        assert sum(doc.page_content in prompt for prompt in map_calls) == expected
+
+
+def test_failed_map_call_keeps_the_other_outputs_cached(tmp_path):
+    documents = make_documents(40)
+    chunk_tokens = 4 * count_tokens(documents[0].page_content)
+    chunks = pack_by_tokens([doc.page_content for doc in documents], chunk_tokens)
+    cache = LLMResponseCache(str(tmp_path / "llm"))
+    llm = FakeLLM(rate_limit_once=documents[-1].page_content)
+
+    with pytest.raises(RuntimeError, match="429"):
+        make_summarizer(llm, cache).generate_summary_map_reduce(documents, chunk_tokens=chunk_tokens)
+    make_summarizer(llm, cache).generate_summary_map_reduce(documents, chunk_tokens=chunk_tokens)
+
+    assert len(llm.calls("one batch of tweets")) == len(chunks) + 1
@@ -0,0 +1,96 @@
+import base64
+import json
+import os
+
+import pytest
+
+from timeline_capture import TimelineCapture, parse_timeline_payload
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES, name), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def tweets():
+    return parse_timeline_payload(load_fixture("list_timeline.json"))
+
+
+def test_payload_yields_tweets_in_timeline_order(tweets):
+    assert [t["tweet_url"].rsplit("/", 1)[1][-1] for t in tweets] == ["1", "0", "3", "4"]
+
+
+def test_links_and_media(tweets):
+    ada = tweets[0]
+    assert ada["author_name"] == "Ada Lovelace" and ada["author_handle"] == "@ada"
+    assert ada["date"] == "2025-03-05" and ada["time"] == "10:15:00"
+    # t.co links expanded, media links dropped, entities unescaped
+    assert ada["text"] == "Notes on the engine https://example.com/notes & more"
+    assert ada["mentioned_urls"] == ["https://example.com/notes"]
+    assert ada["media_type"] == "Image"
+    assert ada["image_urls"] == ["https://pbs.twimg.com/media/p1.jpg"]
+
+
+def test_retweet_is_reported_as_reposted_original(tweets):
+    repost = tweets[1]
+    assert repost["is_reposted"]
+    assert repost["author_handle"] == "@grace"  # Name read from the newer `core` layout
+    assert repost["tweet_url"] == "https://x.com/grace/status/1900000000000000000"
+    assert repost["media_type"] == "Video" and repost["lang"] == "fr"
+
+
+def test_visibility_wrapper_and_note_tweet(tweets):
+    assert tweets[2]["text"] == "Limited reply"
+    assert tweets[3]["text"] == "Full long post with https://example.com/long"
+
+
+def test_cursor_only_payload_is_empty():
+    assert parse_timeline_payload(load_fixture("list_timeline_empty.json")) == []
+
+
+class LogDriver:
+    """Serves canned performance-log entries and response bodies."""
+
+    def __init__(self, entries, bodies):
+        self.entries = entries
+        self.bodies = bodies
+
+    def get_log(self, kind):
+        assert kind == "performance"
+        entries, self.entries = self.entries, []
+        return entries
+
+    def execute_cdp_cmd(self, command, params):
+        assert command == "Network.getResponseBody"
+        return self.bodies[params["requestId"]]
+
+
+def log_entry(method, **params):
+    return {"message": json.dumps({"message": {"method": method, "params": params}})}
+
+
+def test_capture_drains_finished_timeline_responses():
+    payload = load_fixture("list_timeline.json")
+    driver = LogDriver(
+        [
+            log_entry("Network.responseReceived", requestId="1",
+                      response={"url": "https://x.com/i/api/graphql/abc/ListLatestTweetsTimeline?variables=1"}),
+            log_entry("Network.responseReceived", requestId="2", response={"url": "https://x.com/i/api/other"}),
+            log_entry("Network.loadingFinished", requestId="2"),
+            log_entry("Network.responseReceived", requestId="3",
+                      response={"url": "https://x.com/i/api/graphql/abc/ListLatestTweetsTimeline?variables=2"}),
+            log_entry("Network.loadingFinished", requestId="1"),
+        ],
+        {
+            "1": {"body": json.dumps(payload), "base64Encoded": False},
+            "3": {"body": base64.b64encode(json.dumps(payload).encode()).decode(), "base64Encoded": True},
+        },
+    )
+    capture = TimelineCapture(driver)
+    assert capture.drain() == [payload]
+    # Request 3 finishes on a later drain
+    driver.entries = [log_entry("Network.loadingFinished", requestId="3")]
+    assert capture.drain() == [payload]
@@ -0,0 +1,119 @@
+import os
+from datetime import datetime
+
+from tweet_extractor import extract_visible_tweets, parse_extracted_tweet
+from twitter_scraper import DateWindowFilter
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "timeline.html")
+
+
+def raw_tweet(**overrides):
+    raw = {
+        "author_details": "Ada Lovelace\n@ada",
+        "datetime": "2025-03-05T10:15:00.000Z",
+        "text": "hello",
+        "lang": "en",
+        "tweet_url": "https://x.com/ada/status/1",
+        "mentioned_urls": ["https://t.co/abc"],
+        "is_reposted": False,
+        "has_video": False,
+        "has_photo": True,
+        "image_urls": ["https://pbs.twimg.com/media/a.jpg"],
+    }
+    raw.update(overrides)
+    return raw
+
+
+def test_parse_extracted_tweet_matches_process_tweet_fields():
+    tweet = parse_extracted_tweet(raw_tweet())
+    assert tweet == {
+        "text": "hello",
+        "author_name": "Ada Lovelace",
+        "author_handle": "@ada",
+        "date": "2025-03-05",
+        "time": "10:15:00",
+        "lang": "en",
+        "tweet_url": "https://x.com/ada/status/1",
+        "mentioned_urls": ["https://t.co/abc"],
+        "is_reposted": False,
+        "media_type": "Image",
+        "image_urls": ["https://pbs.twimg.com/media/a.jpg"],
+    }
+
+
+def test_parse_extracted_tweet_media_and_missing_fields():
+    assert parse_extracted_tweet(raw_tweet(has_video=True))["media_type"] == "Video"
+    assert parse_extracted_tweet(raw_tweet(has_photo=False))["media_type"] == "No media"
+    assert parse_extracted_tweet(raw_tweet(author_details="Solo"))["author_handle"] == ""
+    assert parse_extracted_tweet(raw_tweet(datetime="")) is None
+
+
+def test_extract_tweets_js_on_static_timeline(chrome):
+    chrome.get("file://" + FIXTURE)
+    tweets = extract_visible_tweets(chrome, limit=0, remove=True)
+
+    assert [t["author_handle"] for t in tweets] == ["@ada", "@alan"]
+    ada, alan = tweets
+    assert ada["tweet_url"] == "https://x.com/ada/status/1900000000000000001"
+    assert ada["date"] == "2025-03-05" and ada["time"] == "10:15:00"
+    assert "https://t.co/abc123" in ada["mentioned_urls"]
+    assert ada["media_type"] == "Image"
+    assert ada["image_urls"] == ["https://pbs.twimg.com/media/photo1.jpg"]
+    assert alan["is_reposted"] and alan["media_type"] == "Video" and alan["lang"] == "fr"
+    # Extracted articles are removed so the next call sees the next batch
+    assert chrome.execute_script("return document.querySelectorAll(\"article[data-testid='tweet']\").length") == 0
+
+
+def test_extract_tweets_js_respects_limit(chrome):
+    chrome.get("file://" + FIXTURE)
+    assert len(extract_visible_tweets(chrome, limit=1, remove=True)) == 1
+    assert [t["author_handle"] for t in extract_visible_tweets(chrome, limit=0, remove=False)] == ["@alan"]
+
+
+def window_tweet(date, i, reposted=False):
+    return {"date": date, "is_reposted": reposted, "tweet_url": f"https://x.com/a/status/{i}"}
+
+
+def feed(window, dates):
+    for i, date in enumerate(dates):
+        window.add(window_tweet(date, i))
+        if window.done:
+            break
+    return [t["date"] for t in window.tweets]
+
+
+def new_window(**kwargs):
+    return DateWindowFilter(datetime(2025, 3, 1), datetime(2025, 3, 7), **kwargs)
+
+
+def test_window_stops_after_stale_streak():
+    window = new_window()
+    assert feed(window, ["2025-03-05", "2025-02-20", "2025-02-19", "2025-02-18", "2025-03-04"]) == ["2025-03-05"]
+    assert window.done
+
+
+def test_newer_tweet_ends_streak_but_is_not_kept():
+    window = new_window()
+    kept = feed(window, ["2025-02-20", "2025-02-21", "2025-03-09", "2025-02-20", "2025-02-19", "2025-03-05"])
+    # The newer tweet reset the streak, so the later pair did not stop the scrape
+    assert not window.done
+    assert kept == ["2025-02-20", "2025-02-21", "2025-02-20", "2025-02-19", "2025-03-05"]
+    assert window.newer_skipped == 1
+
+
+def test_reposted_old_tweet_does_not_start_a_streak():
+    window = new_window(max_old_streak=2)
+    window.add(window_tweet("2025-02-01", 1, reposted=True))
+    window.add(window_tweet("2025-02-02", 2))
+    assert not window.done
+    assert [t["date"] for t in window.tweets] == ["2025-02-01"]
+
+
+def test_window_stops_at_checkpoint():
+    window = new_window(since_id=5)
+    for i in (9, 7, 5, 3):
+        window.add(window_tweet("2025-03-05", i))
+        if window.done:
+            break
+    assert window.done
+    assert [t["tweet_url"][-1] for t in window.tweets] == ["9", "7"]
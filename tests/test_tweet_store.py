@@ -0,0 +1,91 @@
+import pytest
+
+from fake_browser import FakeDriverManager, FakeTimelineDriver, make_timeline
+from scrape_scheduler import _store_spool, scrape_lists_to_store
+from tweet_store import CheckpointStore, SeenTweetIds, TweetSpool, TweetStore
+from twitter_scraper import TwitterScraper
+
+LIST_URL = "https://x.com/i/lists/1"
+
+
+def tweet_row(i):
+    return {
+        "text": f"tweet number {i}", "author_name": "Author", "author_handle": "@author",
+        "date": "2025-03-06", "time": f"{12 - i // 60:02d}:{59 - i % 60:02d}", "lang": "en",
+        "tweet_url": f"https://x.com/author/status/{10_000 - i}", "mentioned_urls": [],
+        "is_reposted": False, "media_type": "text", "image_urls": [],
+    }
+
+
+def test_seen_ids_keep_a_bounded_window_in_memory(tmp_path):
+    seen = SeenTweetIds(str(tmp_path / "seen.txt"), max_recent=10)
+    for i in range(50):
+        assert seen.add(tweet_row(i)["tweet_url"])
+    assert not seen.add(tweet_row(49)["tweet_url"])
+    assert len(seen) == 50 and len(seen._recent) == 10
+    # The file keeps the full record for resuming
+    assert seen.ids() == [str(10_000 - i) for i in range(50)]
+    seen.close()
+
+    reopened = SeenTweetIds(str(tmp_path / "seen.txt"), max_recent=10)
+    assert len(reopened) == 50 and tweet_row(45)["tweet_url"] in reopened
+    reopened.close()
+
+
+def test_spool_streams_parts_into_the_store(tmp_path):
+    spool = TweetSpool(str(tmp_path / "spool"), batch_size=20)
+    spool.extend(tweet_row(i) for i in range(55))
+    assert len(spool.parts()) == 3
+    assert [len(part) for part in spool.dataframes()] == [20, 20, 15]
+
+    store = TweetStore(str(tmp_path / "store"))
+    checkpoints = CheckpointStore(str(tmp_path / "checkpoints.json"))
+    assert _store_spool("list", spool, store, checkpoints) == 55
+    assert _store_spool("list", spool, store, checkpoints) == 0
+    assert len(store.load()) == 55
+    assert checkpoints.since_id("list") == 10_000
+
+
+def spooled_scrape(tmp_path, timeline, since_id):
+    scraper = TwitterScraper(FakeDriverManager([FakeTimelineDriver(timeline)]), seen_dir=str(tmp_path / "seen"),
+                             spool_dir=str(tmp_path / "spool"))
+    spool = scraper.fetch_tweets_list_batched(LIST_URL, "2025-03-01", "2025-03-07", batch_size=20,
+                                              max_empty_batches=2, since_id=since_id)
+    return spool, scraper.last_fetch_complete
+
+
+def test_checkpoint_holds_when_the_timeline_runs_dry_before_it(tmp_path):
+    checkpoints = CheckpointStore(str(tmp_path / "checkpoints.json"))
+    checkpoints.checkpoints[LIST_URL] = {"last_tweet_id": "9000", "last_datetime": "2025-03-05 20:00"}
+    # 30 tweets (IDs 10000..9971) load, then nothing: the tweets down to 9000 were never read
+    spool, complete = spooled_scrape(tmp_path, make_timeline(30, old_tail=0), since_id=9000)
+
+    store = TweetStore(str(tmp_path / "store"))
+    assert not complete
+    assert _store_spool(LIST_URL, spool, store, checkpoints, complete) == 30
+    assert checkpoints.since_id(LIST_URL) == 9000
+
+
+def test_checkpoint_advances_once_the_scrape_reaches_it(tmp_path):
+    checkpoints = CheckpointStore(str(tmp_path / "checkpoints.json"))
+    spool, complete = spooled_scrape(tmp_path, make_timeline(30, old_tail=0), since_id=9980)
+
+    assert complete and len(spool) == 20
+    _store_spool(LIST_URL, spool, TweetStore(str(tmp_path / "store")), checkpoints, complete)
+    assert checkpoints.since_id(LIST_URL) == 10_000
+
+
+def test_clear_deletes_the_spooled_parts(tmp_path):
+    spool = TweetSpool(str(tmp_path / "spool" / "list"), batch_size=20)
+    spool.extend(tweet_row(i) for i in range(30))
+    _store_spool("list", spool, TweetStore(str(tmp_path / "store")))
+    spool.clear()
+
+    assert not (tmp_path / "spool" / "list").exists()
+    assert len(spool) == 0 and list(spool.dataframes()) == []
+
+
+def test_store_scrape_requires_a_spool_dir(tmp_path):
+    with pytest.raises(ValueError, match="spool_dir"):
+        scrape_lists_to_store(["https://x.com/i/lists/1"], "2025-03-01", "2025-03-07", "user", "secret",
+                              TweetStore(str(tmp_path / "store")), spool_dir=None)
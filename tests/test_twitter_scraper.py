@@ -0,0 +1,109 @@
+import pytest
+from selenium.common.exceptions import InvalidSessionIdException, TimeoutException, WebDriverException
+
+from fake_browser import FakeDriverManager, FakeTimelineDriver, make_timeline
+from twitter_scraper import TwitterScraper, _session_lost
+from tweet_store import TweetSpool
+from waits import wait_for_tweet
+
+LIST_URL = "https://x.com/i/lists/1"
+
+
+class RaisingDriver:
+    def __init__(self, error):
+        self.error = error
+
+    def set_script_timeout(self, timeout):
+        pass
+
+    def execute_async_script(self, script, *args):
+        raise self.error
+
+
+def test_wait_for_tweet_returns_false_only_on_timeout():
+    assert wait_for_tweet(RaisingDriver(TimeoutException("script timeout")), timeout=1) is False
+    with pytest.raises(InvalidSessionIdException):
+        wait_for_tweet(RaisingDriver(InvalidSessionIdException("invalid session id")), timeout=1)
+    with pytest.raises(WebDriverException):
+        wait_for_tweet(RaisingDriver(WebDriverException("chrome not reachable")), timeout=1)
+
+
+def test_session_lost_covers_dead_chrome_and_dead_chromedriver():
+    driver = FakeTimelineDriver([])
+    driver.kill()
+    with pytest.raises(Exception) as dead_chromedriver:
+        driver.get(LIST_URL)
+    assert _session_lost(dead_chromedriver.value)
+    assert _session_lost(WebDriverException("disconnected: not connected to DevTools"))
+    assert _session_lost(ConnectionRefusedError(111, "Connection refused"))
+    assert not _session_lost(TimeoutException("script timeout"))
+    assert not _session_lost(WebDriverException("javascript error: x is undefined"))
+
+
+def scrape(manager, tmp_path, **kwargs):
+    scraper = TwitterScraper(manager, seen_dir=str(tmp_path / "seen"))
+    return scraper.fetch_tweets_list_batched(LIST_URL, "2025-03-01", "2025-03-07", batch_size=20, **kwargs)
+
+
+def test_batched_scrape_reads_the_whole_window(tmp_path):
+    timeline = make_timeline(95)
+    manager = FakeDriverManager([FakeTimelineDriver(timeline)])
+    df = scrape(manager, tmp_path)
+    assert len(df) == 95 and df["tweet_url"].is_unique
+    assert manager.restarts == 0
+
+
+def test_batched_scrape_survives_a_killed_browser(tmp_path):
+    timeline = make_timeline(95)
+    first = FakeTimelineDriver(timeline, kill_after_batches=2, name="first")
+    second = FakeTimelineDriver(timeline, name="second")
+    manager = FakeDriverManager([first, second])
+
+    df = scrape(manager, tmp_path)
+
+    assert manager.restarts == 1 and first.quit_called
+    assert manager.driver is second and second.pages_loaded == 1
+    # The replacement skipped the 40 tweets read before the crash and finished the list
+    assert len(df) == 95 and df["tweet_url"].is_unique
+
+
+def test_batched_scrape_stops_when_the_timeline_runs_dry(tmp_path):
+    timeline = make_timeline(30, old_tail=0)
+    manager = FakeDriverManager([FakeTimelineDriver(timeline)])
+    df = scrape(manager, tmp_path, max_empty_batches=2)
+    assert len(df) == 30
+
+
+def test_spooled_scrape_returns_the_spool_after_a_crash(tmp_path):
+    timeline = make_timeline(95)
+    first = FakeTimelineDriver(timeline, kill_after_batches=2, name="first")
+    manager = FakeDriverManager([first, FakeTimelineDriver(timeline, name="second")])
+    scraper = TwitterScraper(manager, seen_dir=str(tmp_path / "seen"), spool_dir=str(tmp_path / "spool"))
+
+    spool = scraper.fetch_tweets_list_batched(LIST_URL, "2025-03-01", "2025-03-07", batch_size=20)
+
+    assert isinstance(spool, TweetSpool) and len(spool) == 95
+    urls = [url for part in spool.dataframes(columns=["tweet_url"]) for url in part["tweet_url"]]
+    assert len(urls) == 95 and len(set(urls)) == 95
+
+
+class BrokenPageDriver(RaisingDriver):
+    """A live browser whose page scripts keep failing, as after a layout change."""
+
+    def get(self, url):
+        pass
+
+    def execute_script(self, script, *args):
+        raise self.error
+
+
+@pytest.mark.parametrize("fetch", ["fetch_tweets_list", "fetch_tweets_list_batched"])
+def test_persistent_page_errors_give_up_after_max_errors(tmp_path, monkeypatch, fetch):
+    monkeypatch.setattr("waits.time.sleep", lambda seconds: None)
+    error = WebDriverException("javascript error: Cannot read properties of null")
+    manager = FakeDriverManager([BrokenPageDriver(error)])
+    scraper = TwitterScraper(manager, seen_dir=str(tmp_path / "seen"))
+
+    with pytest.raises(WebDriverException, match="javascript error"):
+        getattr(scraper, fetch)(LIST_URL, "2025-03-01", "2025-03-07", max_errors=3)
+    assert manager.restarts == 0
@@ -0,0 +1,97 @@
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+
+from url_cache import URLCache
+from url_resolver import URLResolver
+
+
+class RedirectHandler(BaseHTTPRequestHandler):
+    """/s/<id> redirects to /final/<id>; /final/<id> is a plain 200; /status/<code> answers <code>."""
+
+    def do_HEAD(self):
+        self.server.hits[self.path] += 1
+        if self.path.startswith("/s/"):
+            self.send_response(301)
+            self.send_header("Location", "/final/" + self.path.rsplit("/", 1)[1])
+        elif self.path.startswith("/final/"):
+            self.send_response(200)
+        elif self.path.startswith("/status/"):
+            self.send_response(int(self.path.rsplit("/", 1)[1]))
+        else:
+            self.send_response(404)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), RedirectHandler)
+    httpd.hits = Counter()
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def base_url(server):
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def test_resolve_many_follows_redirects_once_per_url(server):
+    base = base_url(server)
+    urls = [f"{base}/s/{i % 5}" for i in range(20)]
+    mapping = URLResolver(per_host_interval=0).resolve_many(urls)
+
+    assert mapping == {f"{base}/s/{i}": f"{base}/final/{i}" for i in range(5)}
+    assert all(server.hits[f"/s/{i}"] == 1 for i in range(5))
+
+
+def test_resolve_returns_input_when_unresolvable(server):
+    resolver = URLResolver(per_host_interval=0, timeout=2)
+    assert resolver.resolve("") == ""
+    assert resolver.resolve(None) is None
+    # Connection refused: the URL is kept as is
+    assert resolver.resolve("http://127.0.0.1:9/x") == "http://127.0.0.1:9/x"
+
+
+def test_cache_skips_requests_on_second_run(server, tmp_path):
+    base = base_url(server)
+    urls = [f"{base}/s/{i}" for i in range(3)]
+    cache = URLCache(str(tmp_path / "urls.sqlite"))
+    first = URLResolver(per_host_interval=0, cache=cache).resolve_many(urls)
+    second = URLResolver(per_host_interval=0, cache=cache).resolve_many(urls)
+    cache.close()
+
+    assert first == second
+    assert sum(server.hits[f"/s/{i}"] for i in range(3)) == 3
+
+
+def test_error_responses_are_cached_as_failures(server, tmp_path):
+    base = base_url(server)
+    urls = [f"{base}/status/429", f"{base}/status/503"]
+    cache = URLCache(str(tmp_path / "urls.sqlite"))
+    mapping = URLResolver(per_host_interval=0, cache=cache).resolve_many(urls)
+    rows = dict(cache.conn.execute("SELECT short_url, ok FROM url_cache").fetchall())
+    cache.close()
+
+    # Left unresolved, and cached only for the short negative TTL
+    assert mapping == {url: url for url in urls}
+    assert rows == {url: 0 for url in urls}
+
+
+def test_replace_urls_rewrites_text(server):
+    base = base_url(server)
+    series = pd.Series([f"see {base}/s/1 and {base}/s/2", "no links"])
+    mapping = URLResolver(per_host_interval=0).resolve_many([f"{base}/s/1", f"{base}/s/2"])
+    assert URLResolver.replace_urls(series, mapping).tolist() == [
+        f"see {base}/final/1 and {base}/final/2",
+        "no links",
+    ]
@@ -0,0 +1,70 @@
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import assign_thread_numbers, tweet_id_from_url
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
+
+def assign_thread_numbers_loop(df, time_threshold_minutes=2):
+    """The original groupby/iterrows implementation, kept as the reference."""
+    df["datetime"] = pd.to_datetime(df["date"] + " " + df["time"])
+    df.sort_values(by=["author_name", "datetime"], inplace=True)
+
+    thread_numbers = []
+    thread_count = 0
+
+    for author, group in df.groupby("author_name"):
+        last_datetime = None
+        for idx, row in group.iterrows():
+            if last_datetime is None or (row["datetime"] - last_datetime).total_seconds() > time_threshold_minutes * 60:
+                thread_count += 1
+            thread_numbers.append(thread_count)
+            last_datetime = row["datetime"]
+
+    df["thread_number"] = thread_numbers
+    df.drop(columns=["datetime"], inplace=True)
+    return df
+
+
+def load_week(path):
+    return pd.read_csv(path, usecols=["text", "author_name", "date", "time"])
+
+
+def synthetic_tweets(n, n_authors=40, seed=0):
+    """Tweets with bursts of replies, including gaps of exactly the threshold."""
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp("2025-03-01")
+    offsets = rng.choice([0, 30, 60, 119, 120, 121, 600, 7200], size=n).cumsum() % (7 * 24 * 3600)
+    stamps = start + pd.to_timedelta(offsets, unit="s")
+    return pd.DataFrame({
+        "text": [f"tweet {i}" for i in range(n)],
+        "author_name": rng.integers(0, n_authors, size=n).astype(str),
+        "date": stamps.strftime("%Y-%m-%d"),
+        "time": stamps.strftime("%H:%M:%S"),
+    })
+
+
+@pytest.mark.parametrize("path", sorted(glob.glob(os.path.join(DATA_DIR, "*.csv"))), ids=os.path.basename)
+def test_thread_numbers_match_loop_on_weekly_exports(path):
+    expected = assign_thread_numbers_loop(load_week(path))
+    actual = assign_thread_numbers(load_week(path))
+    pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+
+
+@pytest.mark.parametrize("threshold", [0, 1, 2, 10])
+def test_thread_numbers_match_loop_on_synthetic_gaps(threshold):
+    expected = assign_thread_numbers_loop(synthetic_tweets(3000), threshold)
+    actual = assign_thread_numbers(synthetic_tweets(3000), threshold)
+    pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+
+
+def test_tweet_id_from_url():
+    assert tweet_id_from_url("https://x.com/ada/status/123?s=20") == 123
+    assert tweet_id_from_url("https://x.com/ada/status/123/photo/1") == 123
+    assert tweet_id_from_url("https://x.com/ada") is None
+    assert tweet_id_from_url(None) is None
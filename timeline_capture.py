@@ -0,0 +1,163 @@
+# timeline_capture.py
+import json
+import html
+import base64
+from datetime import datetime
+from utils import log
+
+TIMELINE_ENDPOINTS = ("ListLatestTweetsTimeline",)
+
+
+def _unwrap_tweet(result):
+    """Return the Tweet object inside a tweet_results.result node, or None."""
+    if not result:
+        return None
+    if result.get("__typename") == "TweetWithVisibilityResults":
+        result = result.get("tweet") or {}
+    if result.get("__typename", "Tweet") != "Tweet" or "legacy" not in result:
+        return None
+    return result
+
+
+def _user_names(tweet):
+    """Return (name, screen_name) for a Tweet object's author."""
+    user = tweet.get("core", {}).get("user_results", {}).get("result", {})
+    # Newer payloads move name/screen_name from `legacy` to `core`
+    for section in (user.get("core", {}), user.get("legacy", {})):
+        if section.get("screen_name"):
+            return section.get("name", ""), section["screen_name"]
+    return "", ""
+
+
+def _full_text(tweet):
+    """Return the tweet text with t.co links expanded and media links dropped."""
+    legacy = tweet["legacy"]
+    note = tweet.get("note_tweet", {}).get("note_tweet_results", {}).get("result", {})
+    text = note.get("text") or legacy.get("full_text", "")
+    entities = note.get("entity_set") or legacy.get("entities", {})
+    for url in entities.get("urls", []):
+        if url.get("url"):
+            text = text.replace(url["url"], url.get("expanded_url") or url["url"])
+    for media in legacy.get("entities", {}).get("media", []):
+        if media.get("url"):
+            text = text.replace(media["url"], "")
+    return html.unescape(text).strip()
+
+
+def parse_tweet(result, is_reposted=False):
+    """
+    Convert a GraphQL tweet_results.result node into the tweet dict produced by
+    TwitterScraper._process_tweet. Retweets are reported as the original tweet
+    with `is_reposted` set, matching what the rendered timeline shows.
+    """
+    tweet = _unwrap_tweet(result)
+    if tweet is None:
+        return None
+    legacy = tweet["legacy"]
+
+    retweeted = legacy.get("retweeted_status_result", {}).get("result")
+    if retweeted:
+        return parse_tweet(retweeted, is_reposted=True)
+
+    try:
+        tweet_datetime = datetime.strptime(legacy["created_at"], "%a %b %d %H:%M:%S %z %Y")
+    except (KeyError, ValueError) as e:
+        log(f"Error parsing tweet timestamp: {str(e)}")
+        return None
+
+    author_name, screen_name = _user_names(tweet)
+    media = legacy.get("extended_entities", {}).get("media", [])
+    media_types = {item.get("type") for item in media}
+    if media_types & {"video", "animated_gif"}:
+        media_type = "Video"
+    elif "photo" in media_types:
+        media_type = "Image"
+    else:
+        media_type = "No media"
+
+    return {
+        "text": _full_text(tweet),
+        "author_name": author_name,
+        "author_handle": f"@{screen_name}" if screen_name else "",
+        "date": tweet_datetime.strftime('%Y-%m-%d'),
+        "time": tweet_datetime.strftime('%H:%M:%S'),
+        "lang": legacy.get("lang", ""),
+        "tweet_url": f"https://x.com/{screen_name}/status/{tweet.get('rest_id') or legacy.get('id_str')}",
+        "mentioned_urls": [
+            url["expanded_url"] for url in legacy.get("entities", {}).get("urls", []) if url.get("expanded_url")
+        ],
+        "is_reposted": is_reposted,
+        "media_type": media_type,
+        "image_urls": [item["media_url_https"] for item in media if item.get("type") == "photo"],
+    }
+
+
+def parse_timeline_payload(payload):
+    """
+    Extract tweet dicts, in timeline order, from a timeline GraphQL response.
+    Every `tweet_results` node is visited, so single entries and conversation
+    modules are both handled regardless of where the instructions live.
+    """
+    tweets = []
+
+    def walk(node):
+        if isinstance(node, dict):
+            for key, value in node.items():
+                if key == "tweet_results" and isinstance(value, dict):
+                    tweet_data = parse_tweet(value.get("result"))
+                    if tweet_data:
+                        tweets.append(tweet_data)
+                else:
+                    walk(value)
+        elif isinstance(node, list):
+            for item in node:
+                walk(item)
+
+    walk(payload)
+    return tweets
+
+
+class TimelineCapture:
+    """
+    Collect timeline GraphQL responses from Chrome's performance log.
+    The driver must be created with performance logging enabled
+    (WebDriverManager(capture_network=True)).
+    """
+
+    def __init__(self, driver, endpoints=TIMELINE_ENDPOINTS):
+        self.driver = driver
+        self.endpoints = endpoints
+        self._pending = set()
+
+    def drain(self):
+        """
+        Read new performance log entries and return the JSON payloads of
+        timeline responses that have finished loading.
+        """
+        payloads = []
+        for entry in self.driver.get_log("performance"):
+            message = json.loads(entry["message"])["message"]
+            method = message.get("method")
+            params = message.get("params", {})
+            if method == "Network.responseReceived":
+                response_url = params.get("response", {}).get("url", "")
+                if any(endpoint in response_url for endpoint in self.endpoints):
+                    self._pending.add(params["requestId"])
+            elif method == "Network.loadingFinished" and params.get("requestId") in self._pending:
+                request_id = params["requestId"]
+                self._pending.discard(request_id)
+                payload = self._response_body(request_id)
+                if payload is not None:
+                    payloads.append(payload)
+        return payloads
+
+    def _response_body(self, request_id):
+        try:
+            body = self.driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+            content = body["body"]
+            if body.get("base64Encoded"):
+                content = base64.b64decode(content).decode("utf-8")
+            return json.loads(content)
+        except Exception as e:
+            log(f"Error reading timeline response {request_id}: {str(e)}")
+            return None
@@ -0,0 +1,49 @@
+# token_utils.py
+from utils import log
+
+_encoding = None
+_encoding_loaded = False
+
+
+def _get_encoding():
+    """Load the tiktoken encoding once; fall back to a heuristic if it is unavailable."""
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            log(f"tiktoken unavailable ({str(e)}); estimating tokens as characters / 4.")
+    return _encoding
+
+
+def count_tokens(text):
+    """Count tokens in `text` with tiktoken, or estimate them if it is not available."""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return max(1, len(text) // 4)
+
+
+def pack_by_tokens(items, token_budget, key=lambda item: item, count=None):
+    """
+    Greedily pack `items`, in order, into chunks whose token count stays within
+    `token_budget`. `key` maps an item to its text; `count` may instead return
+    an item's precomputed token count. An item larger than the budget gets a
+    chunk of its own.
+    """
+    chunks = []
+    current, current_tokens = [], 0
+    for item in items:
+        tokens = count(item) if count else count_tokens(key(item))
+        if current and current_tokens + tokens > token_budget:
+            chunks.append(current)
+            current, current_tokens = [], 0
+        current.append(item)
+        current_tokens += tokens
+    if current:
+        chunks.append(current)
+    return chunks
@@ -0,0 +1,117 @@
+# topics.py
+import re
+import numpy as np
+from sklearn.cluster import KMeans
+from sklearn.decomposition import NMF
+from sklearn.feature_extraction.text import TfidfVectorizer, ENGLISH_STOP_WORDS
+from utils import log
+
+DEFAULT_EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+OTHER_TOPIC = "Other"
+# Tweet filler that would otherwise dominate topic keywords
+STOP_WORDS = list(ENGLISH_STOP_WORDS | {"don", "just", "like", "really", "think", "know", "people", "good", "new", "today"})
+_URL_RE = re.compile(r"https?://\S+|www\.\S+")
+
+
+class SentenceEmbedder:
+    """Small CPU sentence-transformers model that embeds texts in batches."""
+
+    def __init__(self, model_name=DEFAULT_EMBEDDING_MODEL, batch_size=64, device="cpu"):
+        from sentence_transformers import SentenceTransformer
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.model = SentenceTransformer(model_name, device=device)
+
+    def embed(self, texts):
+        """Return an (n, dim) float32 matrix of L2-normalized embeddings."""
+        return self.model.encode(
+            list(texts), batch_size=self.batch_size, normalize_embeddings=True,
+            convert_to_numpy=True, show_progress_bar=False,
+        ).astype(np.float32)
+
+
+def load_embedder(model_name=DEFAULT_EMBEDDING_MODEL, **kwargs):
+    """Load a SentenceEmbedder, or return None (TF-IDF + NMF fallback) if it is unavailable."""
+    try:
+        return SentenceEmbedder(model_name, **kwargs)
+    except Exception as e:
+        log(f"Embedding model unavailable ({str(e)}); clustering with TF-IDF + NMF.")
+        return None
+
+
+class TopicClusterer:
+    """
+    Group thread Documents into topics so each newsletter section can be
+    summarized on its own. Uses KMeans over embeddings when an embedder is
+    given, otherwise NMF topics over TF-IDF. Topics smaller than
+    `min_topic_size` are merged into an "Other" group.
+    """
+
+    def __init__(self, n_topics=6, embedder=None, min_topic_size=3, random_state=0):
+        self.n_topics = n_topics
+        self.embedder = embedder
+        self.min_topic_size = min_topic_size
+        self.random_state = random_state
+
+    def _tfidf(self, texts):
+        vectorizer = TfidfVectorizer(
+            sublinear_tf=True, stop_words=STOP_WORDS, min_df=2, max_df=0.5,
+            token_pattern=r"(?u)\b[a-zA-Z][a-zA-Z0-9\-\.]+\b",
+        )
+        return vectorizer, vectorizer.fit_transform([_URL_RE.sub(" ", text) for text in texts])
+
+    def _embedding_labels(self, texts, n_topics):
+        embeddings = self.embedder.embed(texts)
+        return KMeans(n_clusters=n_topics, n_init=10, random_state=self.random_state).fit_predict(embeddings)
+
+    def _nmf_labels(self, matrix, n_topics):
+        weights = NMF(n_components=n_topics, init="nndsvd", random_state=self.random_state, max_iter=400).fit_transform(matrix)
+        labels = weights.argmax(axis=1)
+        labels[weights.max(axis=1) == 0] = -1  # No vocabulary overlap with any topic
+        return labels
+
+    @staticmethod
+    def _keywords(vectorizer, matrix, mask, top_n=4):
+        terms = vectorizer.get_feature_names_out()
+        weights = np.asarray(matrix[mask].mean(axis=0)).ravel()
+        return [terms[i] for i in weights.argsort()[::-1][:top_n] if weights[i] > 0]
+
+    def cluster(self, documents):
+        """
+        Return {topic label: [Documents]}, largest topic first, with documents
+        kept in their original order. Each document's label is also stored in
+        metadata["topic"].
+        """
+        if not documents:
+            return {}
+        texts = [doc.page_content for doc in documents]
+        n_topics = min(self.n_topics, len(texts) // max(self.min_topic_size, 1))
+        try:
+            vectorizer, matrix = self._tfidf(texts)
+        except ValueError:  # Too few shared terms to build a vocabulary
+            n_topics = 0
+        if n_topics < 2:
+            for doc in documents:
+                doc.metadata["topic"] = OTHER_TOPIC
+            return {OTHER_TOPIC: list(documents)}
+
+        if self.embedder is not None:
+            labels = self._embedding_labels(texts, n_topics)
+        else:
+            labels = self._nmf_labels(matrix, n_topics)
+
+        groups = {}
+        for label in sorted(set(labels), key=lambda label: -(labels == label).sum()):
+            mask = labels == label
+            if label == -1 or mask.sum() < self.min_topic_size:
+                name = OTHER_TOPIC
+            else:
+                name = ", ".join(self._keywords(vectorizer, matrix, mask)) or f"Topic {label + 1}"
+            for i in np.flatnonzero(mask):
+                documents[i].metadata["topic"] = name
+                groups.setdefault(name, []).append(i)
+
+        topics = {name: [documents[i] for i in sorted(indices)] for name, indices in groups.items()}
+        log(f"Clustered {len(documents)} threads into {len(topics)} topics: "
+            + "; ".join(f"{name} ({len(docs)})" for name, docs in topics.items()))
+        return topics
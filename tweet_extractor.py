@@ -0,0 +1,173 @@
+# tweet_extractor.py
+from datetime import datetime
+from utils import log
+from waits import SCRIPT_TIMEOUT
+
+# Collects every field _process_tweet reads for up to `arguments[0]` visible tweets
+# in a single WebDriver round-trip. When `arguments[1]` is true the extracted
+# articles are removed from the DOM and the page is scrolled so the timeline
+# loads the next batch.
+EXTRACT_TWEETS_JS = """
+const limit = arguments[0] || 0;
+const removeExtracted = arguments[1];
+let articles = Array.from(document.querySelectorAll("article[data-testid='tweet']"));
+if (limit > 0) {
+    articles = articles.slice(0, limit);
+}
+const text = (el) => (el ? el.innerText : "");
+const tweets = articles.map((article) => {
+    const tweetText = article.querySelector("div[data-testid='tweetText']");
+    const time = article.querySelector("time");
+    const statusLink = article.querySelector("a[href*='/status/']");
+    const firstSpan = article.querySelector("span");
+    return {
+        author_details: text(article.querySelector("div[data-testid='User-Name']")),
+        datetime: time ? time.getAttribute("datetime") : "",
+        text: text(tweetText),
+        lang: tweetText ? tweetText.getAttribute("lang") || "" : "",
+        tweet_url: statusLink ? statusLink.href : "",
+        mentioned_urls: Array.from(article.querySelectorAll("a[href*='http']")).map((a) => a.href),
+        is_reposted: text(firstSpan).includes("reposted"),
+        has_video: !!article.querySelector("div[data-testid='videoPlayer']"),
+        has_photo: !!article.querySelector("div[data-testid='tweetPhoto']"),
+        image_urls: Array.from(article.querySelectorAll("div[data-testid='tweetPhoto'] img")).map((img) => img.src),
+    };
+});
+if (removeExtracted) {
+    articles.forEach((article) => article.remove());
+    window.scrollTo(0, document.body.scrollHeight);
+}
+return tweets;
+"""
+
+
+def parse_extracted_tweet(raw):
+    """
+    Convert one record returned by EXTRACT_TWEETS_JS into the tweet dict
+    produced by TwitterScraper._process_tweet. Returns None if the record
+    has no parseable timestamp.
+    """
+    try:
+        parts = raw["author_details"].split("\n")
+        author_name, author_handle = parts[0], parts[1] if len(parts) > 1 else ""
+        tweet_datetime = datetime.strptime(raw["datetime"], "%Y-%m-%dT%H:%M:%S.000Z")
+    except (KeyError, ValueError) as e:
+        log(f"Error processing tweet: {str(e)}")
+        return None
+
+    if raw.get("has_video"):
+        media_type = "Video"
+    elif raw.get("has_photo"):
+        media_type = "Image"
+    else:
+        media_type = "No media"
+
+    return {
+        "text": raw.get("text", ""),
+        "author_name": author_name,
+        "author_handle": author_handle,
+        "date": tweet_datetime.strftime('%Y-%m-%d'),
+        "time": tweet_datetime.strftime('%H:%M:%S'),
+        "lang": raw.get("lang", ""),
+        "tweet_url": raw.get("tweet_url", ""),
+        "mentioned_urls": raw.get("mentioned_urls", []),
+        "is_reposted": bool(raw.get("is_reposted")),
+        "media_type": media_type,
+        "image_urls": raw.get("image_urls", []),
+    }
+
+
+def extract_visible_tweets(driver, limit=0, remove=True):
+    """
+    Extract up to `limit` visible tweets (all of them if 0) with one
+    execute_script call, optionally removing them from the page.
+    """
+    raw_tweets = driver.execute_script(EXTRACT_TWEETS_JS, limit, remove) or []
+    tweets = []
+    for raw in raw_tweets:
+        tweet_data = parse_extracted_tweet(raw)
+        if tweet_data:
+            tweets.append(tweet_data)
+    return tweets
+
+
+# Removes every rendered tweet whose ID is in `arguments[0]` and scrolls to the
+# bottom, repeating as the timeline loads more, until an unseen tweet is
+# rendered or `arguments[2]` rounds in a row load nothing within `arguments[1]` ms.
+SKIP_SEEN_TWEETS_JS = """
+const seen = new Set(arguments[0]);
+const roundTimeoutMs = arguments[1];
+const maxIdleRounds = arguments[2];
+const done = arguments[arguments.length - 1];
+const selector = "article[data-testid='tweet']";
+const tweetId = (article) => {
+    const link = article.querySelector("a[href*='/status/']");
+    const match = link && link.href.match(/\\/status\\/(\\d+)/);
+    return match ? match[1] : null;
+};
+let skipped = 0;
+let idleRounds = 0;
+const waitForTweets = (next) => {
+    if (document.querySelector(selector)) {
+        next(true);
+        return;
+    }
+    let timer = null;
+    const observer = new MutationObserver(() => {
+        if (document.querySelector(selector)) {
+            observer.disconnect();
+            clearTimeout(timer);
+            next(true);
+        }
+    });
+    observer.observe(document.body, {childList: true, subtree: true});
+    timer = setTimeout(() => {
+        observer.disconnect();
+        next(false);
+    }, roundTimeoutMs);
+};
+const round = () => {
+    let unseen = 0;
+    document.querySelectorAll(selector).forEach((article) => {
+        if (seen.has(tweetId(article))) {
+            article.remove();
+            skipped++;
+        } else {
+            unseen++;
+        }
+    });
+    if (unseen > 0) {
+        done({skipped: skipped, found: true});
+        return;
+    }
+    window.scrollTo(0, document.body.scrollHeight);
+    waitForTweets((loaded) => {
+        idleRounds = loaded ? 0 : idleRounds + 1;
+        if (idleRounds >= maxIdleRounds) {
+            done({skipped: skipped, found: false});
+            return;
+        }
+        round();
+    });
+};
+waitForTweets(() => round());
+"""
+
+
+def skip_seen_tweets(driver, seen_ids, round_timeout=5, max_idle_rounds=3, timeout=600):
+    """
+    Drop every already-seen tweet from the timeline in a single async script
+    call, scrolling until the first unseen tweet is rendered.
+
+    Returns:
+        tuple: (number of tweets skipped, whether an unseen tweet was found).
+    """
+    driver.set_script_timeout(timeout)
+    try:
+        result = driver.execute_async_script(
+            SKIP_SEEN_TWEETS_JS, list(seen_ids), int(round_timeout * 1000), max_idle_rounds
+        ) or {}
+    finally:
+        # Back to the session-wide timeout the other waits rely on
+        driver.set_script_timeout(SCRIPT_TIMEOUT)
+    return result.get("skipped", 0), bool(result.get("found"))
@@ -0,0 +1,341 @@
+# tweet_store.py
+import os
+import ast
+import json
+import uuid
+from collections import OrderedDict
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+import pyarrow.parquet as pq
+from utils import log, tweet_id_from_url
+
+LIST_COLUMNS = ["mentioned_urls", "image_urls"]
+
+TWEET_SCHEMA = pa.schema([
+    ("text", pa.string()),
+    ("author_name", pa.string()),
+    ("author_handle", pa.dictionary(pa.int32(), pa.string())),
+    ("date", pa.string()),
+    ("time", pa.string()),
+    ("lang", pa.dictionary(pa.int32(), pa.string())),
+    ("tweet_url", pa.string()),
+    ("mentioned_urls", pa.list_(pa.string())),
+    ("is_reposted", pa.bool_()),
+    ("media_type", pa.dictionary(pa.int32(), pa.string())),
+    ("image_urls", pa.list_(pa.string())),
+])
+
+DATE_PARTITIONING = ds.partitioning(pa.schema([("date", pa.string())]), flavor="hive")
+
+
+def to_arrow(df):
+    """
+    Convert a tweets DataFrame to an Arrow table typed with TWEET_SCHEMA.
+    Columns outside the schema (e.g. thread_number) keep their inferred types.
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    for field in TWEET_SCHEMA:
+        index = table.schema.get_field_index(field.name)
+        if index != -1:
+            table = table.set_column(index, field, table.column(index).cast(field.type))
+    return table
+
+
+def _lists_to_python(df):
+    """Arrow list columns load as NumPy arrays; turn them back into Python lists."""
+    for column in LIST_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].map(lambda x: list(x) if x is not None else [])
+    return df
+
+
+def normalize_dates(dates):
+    """
+    Parse a Series of tweet dates written as YYYY-MM-DD or, in older exports,
+    DD-MM-YYYY, and return them as YYYY-MM-DD strings (NaN if unparseable).
+    """
+    dates = dates.astype(str)
+    iso = pd.to_datetime(dates, format="%Y-%m-%d", errors="coerce")
+    fallback = pd.to_datetime(dates, format="%d-%m-%Y", errors="coerce")
+    return iso.fillna(fallback).dt.strftime("%Y-%m-%d")
+
+
+def write_tweets(df, path):
+    """Write a tweets DataFrame to a single typed Parquet file."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    pq.write_table(to_arrow(df), path)
+
+
+def read_tweets(path):
+    """
+    Read a tweets file written by write_tweets, or a legacy CSV export whose
+    list columns are stored as Python literals.
+    """
+    if path.endswith(".parquet"):
+        df = pq.read_table(path, memory_map=True).to_pandas()
+        return _lists_to_python(df)
+    df = pd.read_csv(path)
+    for column in LIST_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].apply(lambda x: ast.literal_eval(x) if pd.notna(x) else [])
+    return df
+
+
+class CheckpointStore:
+    """
+    Persist the high-water mark (newest original tweet ID and timestamp) of each
+    scraped list URL, so later runs can stop at already-collected tweets.
+    """
+
+    def __init__(self, path="cache/checkpoints.json"):
+        self.path = path
+        self.checkpoints = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.checkpoints = json.load(f)
+
+    def get(self, list_url):
+        """Return the checkpoint dict for a list URL, or None."""
+        return self.checkpoints.get(list_url)
+
+    def since_id(self, list_url):
+        """Return the newest collected tweet ID for a list URL, or None."""
+        checkpoint = self.get(list_url)
+        return int(checkpoint["last_tweet_id"]) if checkpoint else None
+
+    def update(self, list_url, df):
+        """Advance the checkpoint for a list URL to the newest original tweet in `df`."""
+        if df.empty:
+            return
+        originals = df[~df["is_reposted"].astype(bool)]
+        ids = originals["tweet_url"].map(tweet_id_from_url).dropna()
+        if ids.empty:
+            return
+        newest = originals.loc[ids.astype("int64").idxmax()]
+        newest_id = int(tweet_id_from_url(newest["tweet_url"]))
+        if newest_id <= (self.since_id(list_url) or 0):
+            return
+        self.checkpoints[list_url] = {
+            "last_tweet_id": str(newest_id),
+            "last_datetime": f"{newest['date']} {newest['time']}",
+        }
+        self._save()
+        log(f"Checkpoint for {list_url} advanced to tweet {newest_id}.")
+
+    def _save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.checkpoints, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+class SeenTweetIds:
+    """
+    Append-only record of the tweet IDs already read from one list during a
+    scrape, one ID per line, so a restarted browser can skip them in bulk.
+    Only the latest `max_recent` IDs are also kept in memory to drop repeats
+    as tweets are read; the file holds the full record, which ids() reads
+    back when resuming. Memory stays bounded however long the backfill.
+    """
+
+    def __init__(self, path, max_recent=10_000):
+        self.path = path
+        self.max_recent = max_recent
+        self._recent = OrderedDict()
+        self._count = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        self._remember(line.strip())
+        self._file = open(path, "a", encoding="utf-8", buffering=1)
+
+    def _remember(self, tweet_id):
+        self._recent[tweet_id] = None
+        self._count += 1
+        if len(self._recent) > self.max_recent:
+            self._recent.popitem(last=False)
+
+    def __contains__(self, tweet_url):
+        """True if the tweet is among the latest `max_recent` IDs recorded."""
+        tweet_id = tweet_id_from_url(tweet_url)
+        return tweet_id is not None and str(tweet_id) in self._recent
+
+    def __len__(self):
+        return self._count
+
+    def ids(self):
+        """Every recorded tweet ID, read back from the file."""
+        self._file.flush()
+        with open(self.path, "r", encoding="utf-8") as f:
+            return [line.strip() for line in f if line.strip()]
+
+    def add(self, tweet_url):
+        """Record a tweet URL; returns False if it was seen among the latest `max_recent`."""
+        tweet_id = tweet_id_from_url(tweet_url)
+        if tweet_id is None:
+            return True
+        tweet_id = str(tweet_id)
+        if tweet_id in self._recent:
+            return False
+        self._remember(tweet_id)
+        self._file.write(f"{tweet_id}\n")
+        return True
+
+    def clear(self):
+        self._recent = OrderedDict()
+        self._count = 0
+        self._file.truncate(0)
+
+    def close(self):
+        self._file.close()
+
+
+class TweetSpool:
+    """
+    Buffer scraped tweet dicts and write them to numbered Parquet part files
+    every `batch_size` rows, so a long scrape holds at most one batch in memory.
+    Supports append/extend/len like the list it replaces; dataframes() reads
+    the rows back one part at a time.
+    """
+
+    def __init__(self, directory, batch_size=500):
+        self.directory = directory
+        self.batch_size = batch_size
+        self._buffer = []
+        self._parts = []
+        self._count = 0
+        os.makedirs(directory, exist_ok=True)
+        # Parts left by an earlier run that never got stored
+        for name in os.listdir(directory):
+            if name.startswith("part-") and name.endswith(".parquet"):
+                os.remove(os.path.join(directory, name))
+
+    def __len__(self):
+        return self._count
+
+    def append(self, tweet_data):
+        self._buffer.append(tweet_data)
+        self._count += 1
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def extend(self, rows):
+        for tweet_data in rows:
+            self.append(tweet_data)
+
+    def flush(self):
+        if not self._buffer:
+            return
+        path = os.path.join(self.directory, f"part-{len(self._parts):05d}.parquet")
+        write_tweets(pd.DataFrame(self._buffer), path)
+        self._parts.append(path)
+        self._buffer = []
+
+    def parts(self):
+        """Flush and return the paths of the part files, oldest first."""
+        self.flush()
+        return list(self._parts)
+
+    def dataframes(self, columns=None):
+        """Flush and yield the spooled rows as one DataFrame per part file."""
+        for path in self.parts():
+            df = pq.read_table(path, columns=columns, memory_map=True).to_pandas()
+            yield _lists_to_python(df)
+
+    def clear(self):
+        """Delete the part files (once their rows are stored elsewhere) and empty the spool."""
+        for path in self._parts:
+            if os.path.exists(path):
+                os.remove(path)
+        self._parts = []
+        self._buffer = []
+        self._count = 0
+        try:
+            os.rmdir(self.directory)
+        except OSError:
+            pass  # Not empty, or already gone
+
+
+class TweetStore:
+    """
+    Append-only Parquet dataset of scraped tweets, partitioned by date
+    (<path>/date=YYYY-MM-DD/part-*.parquet) and deduplicated by tweet URL.
+    Thread numbers are not stored; they are recomputed for whatever window is loaded.
+    """
+
+    def __init__(self, path="output/tweet_store"):
+        self.path = path
+        self.filesystem = pafs.LocalFileSystem(use_mmap=True)
+
+    def _dataset(self):
+        if not os.path.isdir(self.path):
+            return None
+        return ds.dataset(
+            self.path, schema=TWEET_SCHEMA, format="parquet",
+            partitioning=DATE_PARTITIONING, filesystem=self.filesystem
+        )
+
+    def _known_urls(self, dates):
+        dataset = self._dataset()
+        if dataset is None:
+            return set()
+        table = dataset.to_table(columns=["tweet_url"], filter=ds.field("date").isin(list(dates)))
+        return set(table.column("tweet_url").to_pylist())
+
+    def append(self, df):
+        """Append rows whose tweet URL is not already stored. Returns the number added."""
+        if df.empty:
+            return 0
+        new_rows = df[[column for column in TWEET_SCHEMA.names if column in df.columns]]
+        new_rows = new_rows.drop_duplicates(subset="tweet_url")
+        new_rows = new_rows[~new_rows["tweet_url"].isin(self._known_urls(new_rows["date"].unique()))]
+        if new_rows.empty:
+            return 0
+
+        ds.write_dataset(
+            to_arrow(new_rows), self.path, format="parquet",
+            partitioning=DATE_PARTITIONING,
+            basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+        )
+        log(f"Appended {len(new_rows)} new tweets to {self.path}.")
+        return len(new_rows)
+
+    def load(self, start_date=None, end_date=None, columns=None):
+        """
+        Load stored tweets dated between start_date and end_date (inclusive,
+        YYYY-MM-DD). Only the matching date partitions are read.
+        """
+        dataset = self._dataset()
+        if dataset is None:
+            return pd.DataFrame()
+        condition = None
+        if start_date:
+            condition = ds.field("date") >= start_date
+        if end_date:
+            upper = ds.field("date") <= end_date
+            condition = upper if condition is None else condition & upper
+        df = dataset.to_table(columns=columns, filter=condition).to_pandas()
+        return _lists_to_python(df)
+
+    def import_csv(self, csv_path):
+        """
+        Import a historical CSV export (e.g. data/tweets_week_*.csv) into the store,
+        normalizing older column names and DD-MM-YYYY dates.
+        """
+        df = read_tweets(csv_path).rename(columns={"is_retweet": "is_reposted"})
+        df["date"] = normalize_dates(df["date"])
+        df = df.dropna(subset=["date", "tweet_url"])
+        df["is_reposted"] = df["is_reposted"].astype(bool)
+        return self.append(df)
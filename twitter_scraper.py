@@ -5,19 +5,117 @@ from datetime import datetime
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException, StaleElementReferenceException
-from utils import log
+from selenium.common.exceptions import (TimeoutException, NoSuchElementException, StaleElementReferenceException,
+                                        InvalidSessionIdException, WebDriverException)
+from utils import log, assign_thread_numbers, tweet_id_from_url
+from tweet_extractor import extract_visible_tweets, skip_seen_tweets
+from tweet_store import SeenTweetIds, TweetSpool
+from timeline_capture import TimelineCapture, parse_timeline_payload
+from waits import Backoff, WaitStats, wait_for_tweet
 from urllib.parse import urlparse
+from urllib3.exceptions import MaxRetryError, ProtocolError
 import requests
 
+_SESSION_LOST_MESSAGES = ("disconnected", "chrome not reachable", "no such window", "session deleted", "tab crashed",
+                          "invalid session id")
+_SCROLL_JS = "window.scrollTo(0, document.body.scrollHeight);"
+
+def _session_lost(error):
+    """
+    True if an error means the browser itself has gone away: Chrome crashed or
+    was killed (a WebDriver error), or chromedriver did (a connection error).
+    """
+    if isinstance(error, (InvalidSessionIdException, MaxRetryError, ProtocolError, ConnectionError)):
+        return True
+    message = str(error).lower()
+    return isinstance(error, WebDriverException) and any(m in message for m in _SESSION_LOST_MESSAGES)
+
+def _reached_checkpoint(tweet_data, since_id):
+    """
+    True if an original (non-reposted) tweet is at or below the `since_id`
+    high-water mark. Reposts are skipped since they can surface old tweet IDs.
+    """
+    if since_id is None or tweet_data["is_reposted"]:
+        return False
+    tweet_id = tweet_id_from_url(tweet_data["tweet_url"])
+    return tweet_id is not None and tweet_id <= since_id
+
+class DateWindowFilter:
+    """
+    Apply the scrape date window to a stream of tweets, in timeline order.
+
+    Two checks run independently on every tweet. The stale streak stops
+    scraping after `max_old_streak` consecutive tweets older than the start
+    date; any newer tweet ends the streak, and the held-back older tweets
+    (e.g. pinned tweets) are kept. The window check keeps tweets up to the end
+    date and counts the newer ones in `newer_skipped`. If `since_id` is given,
+    scraping also stops at the first original tweet at or below it.
+
+    `done` is only set by those two stops. A scrape that ends any other way
+    (the timeline ran dry, or a resumed browser found no unseen tweets) may
+    have missed tweets, so its caller must not advance the checkpoint.
+    """
+    
+    def __init__(self, start_date_obj, end_date_obj, max_old_streak=3, since_id=None, tweets=None):
+        self.start_date_obj = start_date_obj
+        self.end_date_obj = end_date_obj
+        self.max_old_streak = max_old_streak
+        self.since_id = since_id
+        self.tweets = tweets if tweets is not None else []
+        self.done = False
+        self.newer_skipped = 0
+        self._old_tweets = []
+    
+    def add(self, tweet_data):
+        """
+        Consume one tweet dict. Sets `done` once the window has been passed.
+        """
+        if _reached_checkpoint(tweet_data, self.since_id):
+            log("Reached already-collected tweets. Stopping.")
+            self.done = True
+            return
+        tweet_date = datetime.strptime(tweet_data["date"], "%Y-%m-%d")
+        
+        # Stale streak: reposts of old tweets only extend a streak, never start one
+        if tweet_date < self.start_date_obj and (self._old_tweets or not tweet_data["is_reposted"]):
+            self._old_tweets.append(tweet_data)
+            if len(self._old_tweets) >= self.max_old_streak:
+                log("No valid tweets found within range. Stopping.")
+                self.done = True
+            return
+        if self._old_tweets:
+            log("Found a newer tweet after older ones. Continuing...")
+            self.tweets.extend(self._old_tweets)
+            self._old_tweets = []
+        
+        # Window: the tweet ended any streak above whether or not it is kept here
+        if tweet_date > self.end_date_obj:
+            self.newer_skipped += 1
+            return
+        self.tweets.append(tweet_data)
+
 class TwitterScraper:
     """
     Handles tweet extraction, processing, and analysis.
+    
+    For long backfills, set `heap_limit_mb` to reload the page (resuming past
+    seen tweets) whenever Chrome's JS heap grows beyond it, and `spool_dir` to
+    write scraped rows to Parquet in batches instead of keeping them in memory.
+    With `spool_dir`, the fetch methods return the TweetSpool itself (rows
+    without thread numbers) for the caller to read part by part.
     """
     
-    def __init__(self, driver_manager):
+    def __init__(self, driver_manager, seen_dir="cache/seen", heap_limit_mb=None, spool_dir=None,
+                 memory_check_every=100):
         self.driver_manager = driver_manager
         self.driver = self.driver_manager.driver
+        self.wait_stats = WaitStats()
+        self.seen_dir = seen_dir
+        self.heap_limit_mb = heap_limit_mb
+        self.spool_dir = spool_dir
+        self.memory_check_every = memory_check_every
+        # Whether the last fetch read down to the checkpoint or past the start date
+        self.last_fetch_complete = False
     
     def _initialize_driver(self):
         """
@@ -27,24 +125,73 @@ class TwitterScraper:
         self.driver_manager.restart_driver()
         self.driver = self.driver_manager.driver
     
-    def _get_first_tweet(self, timeout=10, max_retries=5, retry_delay=2):
+    def _recover_session(self, url, seen):
+        """Replace a dead browser (from the pool if there is one) and resume `url` past `seen`."""
+        log("Browser session lost. Switching to a new session...")
+        with self.wait_stats.measure("wait", "driver restart"):
+            self._initialize_driver()
+        self.resume_from_last_processed(url, seen)
+    
+    def _seen_tweets(self, url):
         """
-        Retrieve the first tweet element from the page.
+        Start an empty record of the tweets read from `url`, used to resume
+        after a browser crash.
         """
-        retries = 0
-        while retries < max_retries:
+        list_key = urlparse(url).path.strip("/").replace("/", "_") or "home"
+        seen = SeenTweetIds(os.path.join(self.seen_dir, f"{list_key}.txt"))
+        seen.clear()
+        return seen
+    
+    def _new_rows(self, url):
+        """Return the container scraped rows go into: a list, or a TweetSpool."""
+        if not self.spool_dir:
+            return []
+        list_key = urlparse(url).path.strip("/").replace("/", "_") or "home"
+        return TweetSpool(os.path.join(self.spool_dir, list_key))
+    
+    def _manage_memory(self, url, seen):
+        """
+        Run Chrome's garbage collector, and reload the page if its JS heap is
+        still above `heap_limit_mb`.
+        """
+        try:
+            self.driver.execute_script("if (window.gc) { window.gc(); }")
+            if not self.heap_limit_mb:
+                return
+            heap_mb = self.driver_manager.heap_usage_mb()
+        except Exception as e:
+            log(f"Error checking browser memory: {str(e)}")
+            return
+        log(f"Chrome JS heap: {heap_mb:.0f} MB.")
+        if heap_mb > self.heap_limit_mb:
+            log(f"JS heap above {self.heap_limit_mb} MB. Recycling the page...")
+            with self.wait_stats.measure("wait", "page recycle"):
+                self.resume_from_last_processed(url, seen)
+    
+    def _get_first_tweet(self, timeout=10, max_retries=5, retry_delay=0.5, max_retry_delay=8):
+        """
+        Retrieve the first tweet element from the page, backing off
+        exponentially between attempts.
+        """
+        backoff = Backoff(base=retry_delay, cap=max_retry_delay)
+        for attempt in range(1, max_retries + 1):
             try:
-                WebDriverWait(self.driver, timeout).until(
-                    lambda d: d.find_elements(By.XPATH, "//article[@data-testid='tweet']")
-                )
-                return self.driver.find_element(By.XPATH, "//article[@data-testid='tweet']")
+                return self._wait_for_next_tweet(timeout, "first tweet")
             except (TimeoutException, NoSuchElementException, StaleElementReferenceException):
-                log(f"Retrying tweet search ({retries + 1}/{max_retries})...")
-                retries += 1
-                time.sleep(retry_delay)
+                log(f"Retrying tweet search ({attempt}/{max_retries})...")
+                backoff.sleep(self.wait_stats, "first tweet retry")
         log("No tweet found after retries.")
         return None
     
+    def _wait_for_next_tweet(self, timeout=10, label="next tweet"):
+        """
+        Wait until a tweet article is rendered and return it. Raises
+        TimeoutException if none appears within `timeout` seconds.
+        """
+        if not wait_for_tweet(self.driver, timeout, self.wait_stats, label):
+            raise TimeoutException(f"No tweet rendered within {timeout}s")
+        return self.driver.find_element(By.XPATH, self._get_tweet_xpath())
+    
     def _get_tweet_xpath(self):
         """
         Return the XPath for the first tweet element.
@@ -62,114 +209,253 @@ class TwitterScraper:
             log("Failed to clear tweet due to stale element or timeout. Skipping...")
             pass
     
-    def resume_from_last_processed(self, last_processed_tweet_url, url):
+    def resume_from_last_processed(self, url, seen):
         """
-        After restarting the driver, load the URL and delete tweets until
-        the last processed tweet (identified by its URL) is removed,
-        so that processing resumes with tweets that haven't been seen.
+        After restarting the driver, reload the URL and drop every tweet in
+        `seen` with one script call, so processing resumes at the first unseen
+        tweet however far down the timeline the crash happened.
         """
-        log(f"Resuming from last processed tweet: {last_processed_tweet_url}")
-        self.driver.get(url)
-        time.sleep(5)
+        log(f"Resuming {url} after {len(seen)} seen tweets...")
         try:
-            while True:
-                tweet_element = self._get_first_tweet()
-                if not tweet_element:
-                    break
-                tweet_url = self.get_tweet_url(tweet_element)
-                if tweet_url == last_processed_tweet_url:
-                    self._delete_first_tweet()
-                    log("Found and deleted last processed tweet; resuming processing after this tweet.")
-                    break
-                else:
-                    self._delete_first_tweet()
+            self.driver.get(url)
+            with self.wait_stats.measure("wait", "resume"):
+                skipped, found = skip_seen_tweets(self.driver, seen.ids())
+            if found:
+                log(f"Skipped {skipped} already-seen tweets; resuming processing.")
+            else:
+                log(f"Skipped {skipped} already-seen tweets; no unseen tweets loaded.")
         except Exception as e:
             log(f"Error resuming from last processed tweet: {str(e)}")
     
-    def fetch_tweets_list(self, url, start_date, end_date, time_threshold_minutes=2):
+    def fetch_tweets_list(self, url, start_date, end_date, time_threshold_minutes=2, since_id=None,
+                          max_empty_waits=5, max_errors=10):
         log(f"Fetching tweets from {url}...")
         self.driver.get(url)
-        start_date_obj = datetime.strptime(start_date, "%Y-%m-%d")
-        end_date_obj = datetime.strptime(end_date, "%Y-%m-%d")
-        tweets = []
+        window = DateWindowFilter(
+            datetime.strptime(start_date, "%Y-%m-%d"),
+            datetime.strptime(end_date, "%Y-%m-%d"),
+            since_id=since_id,
+            tweets=self._new_rows(url)
+        )
         count = 0
+        empty_waits = 0
+        self.wait_stats = WaitStats()
+        backoff = Backoff()
+        seen = self._seen_tweets(url)
         
-        while True:
+        while not window.done:
             try:
                 if self.driver is None:
-                    log("WebDriver session lost. Restarting driver...")
-                    self.driver_manager.restart_driver()
-                    self.driver = self.driver_manager.driver
+                    self._recover_session(url, seen)
                 
-                tweet_element = WebDriverWait(self.driver, 10).until(
-                    EC.presence_of_element_located((By.XPATH, self._get_tweet_xpath()))
-                )
-                if not tweet_element:
-                    log("No tweet element found. Continuing...")
+                if not wait_for_tweet(self.driver, 10, self.wait_stats, "next tweet"):
+                    empty_waits += 1
+                    if empty_waits >= max_empty_waits:
+                        log("No more tweets loaded. Stopping.")
+                        break
+                    log(f"No tweet rendered ({empty_waits}/{max_empty_waits}). Scrolling...")
+                    self.driver.execute_script(_SCROLL_JS)
                     continue
+                empty_waits = 0
+                tweet_element = self.driver.find_element(By.XPATH, self._get_tweet_xpath())
                 
-                tweet_data = self._process_tweet(tweet_element)
+                with self.wait_stats.measure("extract", "process tweet"):
+                    tweet_data = self._process_tweet(tweet_element)
                 if not tweet_data:
                     log("Failed to process tweet data. Continuing...")
                     self._safe_clear_processed_tweet(tweet_element)
                     continue
-                
-                log(f"Processing tweet from {tweet_data['author_name']}, date: {tweet_data['date']}")
-                tweet_date = datetime.strptime(tweet_data["date"], "%Y-%m-%d")
-                
-                if tweet_date < start_date_obj and not tweet_data['is_reposted']:
-                    log("Tweet is older than start date. Checking next tweets...")
-                    old_tweets = [tweet_data]
-                    for _ in range(2):
-                        self._safe_clear_processed_tweet(tweet_element)
-                        try:
-                            next_tweet_element = WebDriverWait(self.driver, 10).until(
-                                EC.presence_of_element_located((By.XPATH, self._get_tweet_xpath()))
-                            )
-                        except TimeoutException:
-                            log("No next tweet found. Stopping.")
-                            break
-                        
-                        next_tweet_data = self._process_tweet(next_tweet_element)
-                        if not next_tweet_data:
-                            log("Failed to process next tweet. Continuing...")
-                            continue
-                        
-                        next_tweet_date = datetime.strptime(next_tweet_data["date"], "%Y-%m-%d")
-                        log(f"Next tweet date: {next_tweet_date}")
-                        old_tweets.append(next_tweet_data)
-                        
-                        if next_tweet_date >= start_date_obj:
-                            log("Found a valid tweet within the range. Continuing...")
-                            tweets.extend(old_tweets)
-                            break
-                        tweet_element = next_tweet_element
-                    else:
-                        log("No valid tweets found within range. Stopping.")
-                        break
-                    continue
-                elif tweet_date > end_date_obj:
-                    log("Tweet is newer than end date. Deleting and continuing...")
+                if not seen.add(tweet_data["tweet_url"]):
                     self._safe_clear_processed_tweet(tweet_element)
                     continue
                 
-                tweets.append(tweet_data)
+                log(f"Processing tweet from {tweet_data['author_name']}, date: {tweet_data['date']}")
+                window.add(tweet_data)
                 self._safe_clear_processed_tweet(tweet_element)
                 count += 1
+                backoff.reset()
                 
-                if count % 100 == 0:
+                if count % self.memory_check_every == 0:
                     log("Triggering Chrome garbage collection...")
-                    self.driver.execute_script("window.gc();")
+                    self._manage_memory(url, seen)
             
             except StaleElementReferenceException:
                 log("Stale element detected. Re-fetching tweet element...")
                 continue
             except Exception as e:
+                if _session_lost(e):
+                    self._recover_session(url, seen)
+                    continue
                 log(f"Error processing tweet: {str(e)}")
-                time.sleep(5)
+                if backoff.attempt >= max_errors:
+                    log(f"{max_errors} consecutive errors reading {url}. Giving up.")
+                    seen.close()
+                    raise
+                backoff.sleep(self.wait_stats, "error backoff")
                 continue
         
-        return self._process_dataframe(tweets, time_threshold_minutes)
+        seen.close()
+        log(f"Skipped {window.newer_skipped} tweets newer than {end_date}.")
+        log(self.wait_stats.report())
+        self.last_fetch_complete = window.done
+        return self._process_dataframe(window.tweets, time_threshold_minutes)
+    
+    def fetch_tweets_list_batched(self, url, start_date, end_date, time_threshold_minutes=2,
+                                  batch_size=50, max_empty_batches=5, since_id=None, max_errors=10):
+        """
+        Same as fetch_tweets_list, but extracts every visible tweet with one
+        execute_script call per batch instead of a dozen WebDriver calls per tweet.
+        Both raise the last error after `max_errors` consecutive failures that
+        leave the browser alive (e.g. a script broken by a page layout change).
+        """
+        log(f"Fetching tweets from {url} in batches of {batch_size}...")
+        self.driver.get(url)
+        window = DateWindowFilter(
+            datetime.strptime(start_date, "%Y-%m-%d"),
+            datetime.strptime(end_date, "%Y-%m-%d"),
+            since_id=since_id,
+            tweets=self._new_rows(url)
+        )
+        empty_batches = 0
+        next_memory_check = self.memory_check_every
+        processed = 0
+        self.wait_stats = WaitStats()
+        backoff = Backoff()
+        seen = self._seen_tweets(url)
+        
+        while not window.done:
+            try:
+                if self.driver is None:
+                    self._recover_session(url, seen)
+                
+                if not wait_for_tweet(self.driver, 10, self.wait_stats, "batch"):
+                    empty_batches += 1
+                    if empty_batches >= max_empty_batches:
+                        log("No more tweets loaded. Stopping.")
+                        break
+                    log(f"No tweets visible ({empty_batches}/{max_empty_batches}). Scrolling...")
+                    self.driver.execute_script(_SCROLL_JS)
+                    continue
+                with self.wait_stats.measure("extract", "batch"):
+                    batch = extract_visible_tweets(self.driver, batch_size)
+            except Exception as e:
+                if _session_lost(e):
+                    self._recover_session(url, seen)
+                    continue
+                log(f"Error extracting tweet batch: {str(e)}")
+                if backoff.attempt >= max_errors:
+                    log(f"{max_errors} consecutive errors reading {url}. Giving up.")
+                    seen.close()
+                    raise
+                backoff.sleep(self.wait_stats, "error backoff")
+                continue
+            
+            empty_batches = 0
+            backoff.reset()
+            log(f"Extracted {len(batch)} tweets in one batch.")
+            for tweet_data in batch:
+                if not seen.add(tweet_data["tweet_url"]):
+                    continue
+                window.add(tweet_data)
+                if window.done:
+                    break
+            
+            processed += len(batch)
+            if not window.done and processed >= next_memory_check:
+                next_memory_check = processed + self.memory_check_every
+                self._manage_memory(url, seen)
+        
+        seen.close()
+        log(f"Skipped {window.newer_skipped} tweets newer than {end_date}.")
+        log(self.wait_stats.report())
+        self.last_fetch_complete = window.done
+        return self._process_dataframe(window.tweets, time_threshold_minutes)
+    
+    def fetch_tweets_list_network(self, url, start_date, end_date, time_threshold_minutes=2,
+                                  page_timeout=10, max_idle_scrolls=5, since_id=None):
+        """
+        Fetch tweets by parsing the timeline JSON responses captured from Chrome's
+        network log, instead of reading the rendered DOM. Requires a driver
+        created with WebDriverManager(capture_network=True).
+
+        After each scroll it waits for the next page of tweets to render (at most
+        `page_timeout` seconds), by which point its response has been logged.
+        """
+        log(f"Capturing timeline responses from {url}...")
+        capture = TimelineCapture(self.driver)
+        capture.drain()  # Discard responses from earlier pages
+        self.driver.get(url)
+        window = DateWindowFilter(
+            datetime.strptime(start_date, "%Y-%m-%d"),
+            datetime.strptime(end_date, "%Y-%m-%d"),
+            since_id=since_id,
+            tweets=self._new_rows(url)
+        )
+        seen_urls = set()
+        idle_scrolls = 0
+        self.wait_stats = WaitStats()
+        
+        while not window.done:
+            try:
+                wait_for_tweet(self.driver, page_timeout, self.wait_stats, "timeline page")
+                with self.wait_stats.measure("extract", "timeline responses"):
+                    payloads = capture.drain()
+            except Exception as e:
+                if _session_lost(e):
+                    capture = self._reopen_capture(url)
+                    continue
+                log(f"Error reading network log: {str(e)}")
+                payloads = []
+            
+            new_tweets = []
+            for payload in payloads:
+                for tweet_data in parse_timeline_payload(payload):
+                    if tweet_data["tweet_url"] not in seen_urls:
+                        seen_urls.add(tweet_data["tweet_url"])
+                        new_tweets.append(tweet_data)
+            
+            if not new_tweets:
+                idle_scrolls += 1
+                if idle_scrolls >= max_idle_scrolls:
+                    log("No new timeline responses. Stopping.")
+                    break
+            else:
+                idle_scrolls = 0
+                log(f"Captured {len(new_tweets)} tweets from {len(payloads)} timeline responses.")
+            
+            for tweet_data in new_tweets:
+                window.add(tweet_data)
+                if window.done:
+                    break
+            
+            # Drop rendered tweets so the page stays light, then request the next page
+            try:
+                self.driver.execute_script(
+                    "document.querySelectorAll(\"article[data-testid='tweet']\").forEach((a) => a.remove());"
+                    + _SCROLL_JS
+                )
+            except Exception as e:
+                if not _session_lost(e):
+                    raise
+                capture = self._reopen_capture(url)
+        
+        log(f"Skipped {window.newer_skipped} tweets newer than {end_date}.")
+        log(self.wait_stats.report())
+        self.last_fetch_complete = window.done
+        return self._process_dataframe(window.tweets, time_threshold_minutes)
+    
+    def _reopen_capture(self, url):
+        """
+        Replace a dead browser in network mode and reload `url` with a fresh
+        capture; tweets already captured are skipped by URL.
+        """
+        log("Browser session lost. Switching to a new session...")
+        with self.wait_stats.measure("wait", "driver restart"):
+            self._initialize_driver()
+        capture = TimelineCapture(self.driver)
+        capture.drain()
+        self.driver.get(url)
+        return capture
     
     def _clear_processed_tweet(self, tweet_element):
         try:
@@ -190,7 +476,11 @@ class TwitterScraper:
     def _process_dataframe(self, tweets, time_threshold_minutes):
         """
         Process the extracted tweets into a structured DataFrame with thread numbers.
+        A TweetSpool is flushed and returned as is, never loaded whole.
         """
+        if isinstance(tweets, TweetSpool):
+            log(f"Spooled {len(tweets)} tweets to {len(tweets.parts())} part files.")
+            return tweets
         log("Processing tweets into DataFrame...")
         df = pd.DataFrame(tweets)
         
@@ -198,22 +488,7 @@ class TwitterScraper:
             log("No tweets found.")
             return df
         
-        df["datetime"] = pd.to_datetime(df["date"] + " " + df["time"])
-        df.sort_values(by=["author_name", "datetime"], inplace=True)
-        
-        thread_numbers = []
-        thread_count = 0
-        
-        for author, group in df.groupby("author_name"):
-            last_datetime = None
-            for idx, row in group.iterrows():
-                if last_datetime is None or (row["datetime"] - last_datetime).total_seconds() > time_threshold_minutes * 60:
-                    thread_count += 1
-                thread_numbers.append(thread_count)
-                last_datetime = row["datetime"]
-        
-        df["thread_number"] = thread_numbers
-        df.drop(columns=["datetime"], inplace=True)
+        df = assign_thread_numbers(df, time_threshold_minutes)
         log("DataFrame processing complete.")
         return df
     
@@ -0,0 +1,110 @@
+# url_cache.py
+import os
+import time
+import sqlite3
+
+DAY_SECONDS = 24 * 60 * 60
+
+
+class URLCache:
+    """
+    Persistent SQLite cache of resolved URLs, keyed by the short URL.
+
+    Successful resolutions live for `ttl` seconds, failures for `negative_ttl`
+    seconds. Once the table grows past `max_entries`, the least recently
+    used rows are evicted.
+    """
+
+    def __init__(self, path="cache/url_cache.sqlite", ttl=30 * DAY_SECONDS,
+                 negative_ttl=DAY_SECONDS, max_entries=200_000):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS url_cache (
+                short_url TEXT PRIMARY KEY,
+                resolved_url TEXT NOT NULL,
+                ok INTEGER NOT NULL,
+                resolved_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_url_cache_accessed ON url_cache (accessed_at)")
+        self.conn.commit()
+
+    def get_many(self, urls):
+        """
+        Return {short_url: resolved_url} for every URL with a fresh cache entry.
+        Cached failures map a URL to itself.
+        """
+        urls = list(dict.fromkeys(urls))
+        now = time.time()
+        found = {}
+        # Stay well below SQLite's bound-parameter limit
+        for start in range(0, len(urls), 500):
+            chunk = urls[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self.conn.execute(
+                f"SELECT short_url, resolved_url, ok, resolved_at FROM url_cache WHERE short_url IN ({placeholders})",
+                chunk,
+            ).fetchall()
+            for short_url, resolved_url, ok, resolved_at in rows:
+                max_age = self.ttl if ok else self.negative_ttl
+                if now - resolved_at <= max_age:
+                    found[short_url] = resolved_url
+        if found:
+            self.conn.executemany(
+                "UPDATE url_cache SET accessed_at = ? WHERE short_url = ?",
+                [(now, url) for url in found],
+            )
+            self.conn.commit()
+        self.hits += len(found)
+        self.misses += len(urls) - len(found)
+        return found
+
+    def get(self, url):
+        """Return the cached resolution of a single URL, or None."""
+        return self.get_many([url]).get(url)
+
+    def put_many(self, results):
+        """Store {short_url: (resolved_url, ok)} results and enforce the size bound."""
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO url_cache (short_url, resolved_url, ok, resolved_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+            [(url, resolved, int(ok), now, now) for url, (resolved, ok) in results.items()],
+        )
+        self.conn.commit()
+        self.evict()
+
+    def evict(self):
+        """Drop expired rows, then the least recently used rows beyond `max_entries`."""
+        now = time.time()
+        self.conn.execute(
+            "DELETE FROM url_cache WHERE (ok = 1 AND resolved_at < ?) OR (ok = 0 AND resolved_at < ?)",
+            (now - self.ttl, now - self.negative_ttl),
+        )
+        overflow = self.conn.execute("SELECT COUNT(*) FROM url_cache").fetchone()[0] - self.max_entries
+        if overflow > 0:
+            self.conn.execute(
+                "DELETE FROM url_cache WHERE short_url IN (SELECT short_url FROM url_cache ORDER BY accessed_at LIMIT ?)",
+                (overflow,),
+            )
+        self.conn.commit()
+
+    def stats(self):
+        """Return hit/miss counters and the current number of cached entries."""
+        size = self.conn.execute("SELECT COUNT(*) FROM url_cache").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": size}
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,104 @@
+# url_resolver.py
+import re
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+import requests
+
+URL_PATTERN = r'https?://\S+|www\.\S+'
+URL_REGEX = re.compile(URL_PATTERN)
+
+
+class HostRateLimiter:
+    """
+    Enforce a minimum interval between requests sent to the same host.
+    """
+
+    def __init__(self, min_interval=0.1):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_slot = {}
+
+    def wait(self, host):
+        """Block until the next request slot for `host` is available."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.min_interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+class URLResolver:
+    """
+    Resolve shortened URLs concurrently, deduplicating requests across a whole batch.
+    An optional URLCache short-circuits URLs resolved on previous runs.
+    """
+
+    def __init__(self, max_workers=16, per_host_interval=0.1, timeout=10, cache=None):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.cache = cache
+        self.rate_limiter = HostRateLimiter(per_host_interval)
+        self._local = threading.local()
+
+    def _session(self):
+        """Return a requests session owned by the calling thread."""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            self._local.session = session
+        return session
+
+    def _resolve_one(self, url):
+        """
+        Follow redirects for a single URL.
+        Returns (resolved_url, ok); the URL is returned unchanged on failure.
+        """
+        target = url if url.startswith(("http://", "https://")) else f"http://{url}"
+        try:
+            self.rate_limiter.wait(urlparse(target).netloc)
+            response = self._session().head(target, allow_redirects=True, timeout=self.timeout)
+        except requests.RequestException as e:
+            print(f"Error resolving URL {url}: {e}")
+            return url, False
+        if response.status_code >= 400 and not response.history:
+            # e.g. a rate-limited (429) or failing (5xx) shortener: nothing was resolved
+            print(f"Error resolving URL {url}: HTTP {response.status_code}")
+            return url, False
+        return response.url, True
+
+    def resolve(self, url):
+        """Resolve a single URL to its full form; anything unresolvable is returned unchanged."""
+        if not url:
+            return url
+        return self.resolve_many([url]).get(url, url)
+
+    def resolve_many(self, urls):
+        """
+        Resolve an iterable of URLs and return a {url: resolved_url} mapping.
+        Each distinct URL is requested only once.
+        """
+        unique_urls = list(dict.fromkeys(url for url in urls if url))
+        if not unique_urls:
+            return {}
+
+        mapping = self.cache.get_many(unique_urls) if self.cache is not None else {}
+        pending = [url for url in unique_urls if url not in mapping]
+        if pending:
+            workers = max(1, min(self.max_workers, len(pending)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = dict(zip(pending, executor.map(self._resolve_one, pending)))
+            if self.cache is not None:
+                self.cache.put_many(results)
+            mapping.update({url: resolved for url, (resolved, _) in results.items()})
+        return mapping
+
+    @staticmethod
+    def replace_urls(series, mapping):
+        """Rewrite every URL in a string Series using a resolved-URL mapping."""
+        return series.str.replace(
+            URL_PATTERN, lambda m: mapping.get(m.group(0), m.group(0)), regex=True
+        )
@@ -6,6 +6,28 @@ import pandas as pd
 def log(message):
     print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {message}")
 
+def tweet_id_from_url(tweet_url):
+    """Return the numeric tweet ID from a .../status/<id> URL, or None."""
+    if not isinstance(tweet_url, str) or "/status/" not in tweet_url:
+        return None
+    tweet_id = tweet_url.split("/status/", 1)[1].split("/")[0].split("?")[0]
+    return int(tweet_id) if tweet_id.isdigit() else None
+
+def assign_thread_numbers(df, time_threshold_minutes=2):
+    """
+    Sort tweets by author and time and number threads: consecutive tweets by the
+    same author at most `time_threshold_minutes` apart share a thread number.
+    """
+    df["datetime"] = pd.to_datetime(df["date"] + " " + df["time"])
+    df.sort_values(by=["author_name", "datetime"], inplace=True)
+    
+    # A thread starts at each new author, or after a gap longer than the threshold
+    new_author = df["author_name"].ne(df["author_name"].shift())
+    gap = df.groupby("author_name", sort=False)["datetime"].diff() > pd.Timedelta(minutes=time_threshold_minutes)
+    df["thread_number"] = (new_author | gap).cumsum()
+    df.drop(columns=["datetime"], inplace=True)
+    return df
+
 def group_by_week(df, end_date):
     log("Grouping data into 7-day intervals with thread grouping...")
     end_date_dt = datetime.strptime(end_date, "%Y-%m-%d")
@@ -0,0 +1,118 @@
+# waits.py
+import time
+import random
+from contextlib import contextmanager
+from selenium.common.exceptions import TimeoutException
+from utils import log
+
+TWEET_SELECTOR = "article[data-testid='tweet']"
+
+# Async script timeout set once per driver by WebDriverManager; waits below
+# resolve themselves in JS well before it
+SCRIPT_TIMEOUT = 60
+
+# Resolves as soon as a tweet article is in the DOM, using a MutationObserver
+# instead of polling. Arguments: timeout in ms, then the async callback.
+WAIT_FOR_TWEET_JS = """
+const timeoutMs = arguments[0];
+const done = arguments[arguments.length - 1];
+const selector = "article[data-testid='tweet']";
+if (document.querySelector(selector)) {
+    done(true);
+    return;
+}
+let timer = null;
+const observer = new MutationObserver(() => {
+    if (document.querySelector(selector)) {
+        observer.disconnect();
+        clearTimeout(timer);
+        done(true);
+    }
+});
+observer.observe(document.body, {childList: true, subtree: true});
+timer = setTimeout(() => {
+    observer.disconnect();
+    done(false);
+}, timeoutMs);
+"""
+
+
+class WaitStats:
+    """
+    Accumulate wall time spent waiting versus extracting during a scrape,
+    broken down by label.
+    """
+
+    def __init__(self):
+        self.totals = {}
+        self.started_at = time.monotonic()
+
+    @contextmanager
+    def measure(self, kind, label=""):
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            key = (kind, label)
+            self.totals[key] = self.totals.get(key, 0.0) + time.monotonic() - start
+
+    def add(self, kind, label, seconds):
+        key = (kind, label)
+        self.totals[key] = self.totals.get(key, 0.0) + seconds
+
+    def total(self, kind):
+        return sum(seconds for (k, _), seconds in self.totals.items() if k == kind)
+
+    def report(self):
+        elapsed = time.monotonic() - self.started_at
+        lines = [
+            f"Run time {elapsed:.1f}s: waiting {self.total('wait'):.1f}s, extracting {self.total('extract'):.1f}s"
+        ]
+        for (kind, label), seconds in sorted(self.totals.items(), key=lambda item: -item[1]):
+            lines.append(f"  {kind:<8} {label or '-':<24} {seconds:.1f}s")
+        return "\n".join(lines)
+
+
+class Backoff:
+    """Exponential backoff with a cap and jitter; reset() after a success."""
+
+    def __init__(self, base=0.5, factor=2.0, cap=10.0, jitter=True):
+        self.base = base
+        self.factor = factor
+        self.cap = cap
+        self.jitter = jitter
+        self.attempt = 0
+
+    def next_delay(self):
+        delay = min(self.cap, self.base * self.factor ** self.attempt)
+        self.attempt += 1
+        return delay * random.uniform(0.5, 1.0) if self.jitter else delay
+
+    def sleep(self, stats=None, label="backoff"):
+        delay = self.next_delay()
+        time.sleep(delay)
+        if stats is not None:
+            stats.add("wait", label, delay)
+        return delay
+
+    def reset(self):
+        self.attempt = 0
+
+
+def wait_for_tweet(driver, timeout=10, stats=None, label="tweet"):
+    """
+    Block until a tweet article is present, driven by DOM mutations rather than
+    fixed sleeps. Returns False on timeout; any other WebDriver error (such as
+    a dead browser session) is raised for the caller to handle. Relies on the
+    driver's script timeout being SCRIPT_TIMEOUT, so `timeout` is capped below it.
+    """
+    start = time.monotonic()
+    timeout = min(timeout, SCRIPT_TIMEOUT - 5)
+    try:
+        return bool(driver.execute_async_script(WAIT_FOR_TWEET_JS, int(timeout * 1000)))
+    except TimeoutException as e:
+        log(f"Timed out waiting for tweets: {str(e).strip()}")
+        return False
+    finally:
+        if stats is not None:
+            stats.add("wait", label, time.monotonic() - start)
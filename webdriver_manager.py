@@ -3,13 +3,29 @@ from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-import time
+import os
+from cookie_store import CookieStore
+from waits import SCRIPT_TIMEOUT
+
+# Chrome content settings: 2 = block
+LIGHT_PAGE_PREFS = {
+    "profile.managed_default_content_settings.images": 2,
+    "profile.default_content_setting_values.notifications": 2,
+}
+# Requests dropped by the browser when light_pages is on (fonts and video streams)
+BLOCKED_URL_PATTERNS = ["*.woff", "*.woff2", "*.ttf", "*.otf", "*.mp4", "*.m3u8", "*.m4s", "*video.twimg.com*"]
 
 class WebDriverManager:
-    def __init__(self, username, password, headless=True):
+    def __init__(self, username, password, headless=True, capture_network=False, cookie_path="cache/session_cookies.bin",
+                 user_data_dir=None, light_pages=False, pool=None):
         self.username = username
         self.password = password
         self.headless = headless
+        self.capture_network = capture_network
+        self.cookie_store = CookieStore(cookie_path, password) if cookie_path else None
+        self.user_data_dir = user_data_dir
+        self.light_pages = light_pages
+        self.pool = pool
         self.driver = None
 
     def initialize_driver(self):
@@ -18,15 +34,96 @@ class WebDriverManager:
         options.add_argument('--disable-gpu')
         options.add_argument("--window-size=1920, 1200")
         options.add_argument('--disable-dev-shm-usage')
+        options.add_argument("--js-flags=--expose-gc")  # Enables window.gc()
         if self.headless:
             options.add_argument("--headless")
+        if self.capture_network:
+            # Expose network events through driver.get_log("performance")
+            options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+        if self.user_data_dir:
+            # A persistent profile keeps the HTTP cache and login between launches
+            options.add_argument(f"--user-data-dir={os.path.abspath(self.user_data_dir)}")
+        if self.light_pages:
+            options.add_experimental_option("prefs", LIGHT_PAGE_PREFS)
+            options.add_argument("--blink-settings=imagesEnabled=false")
+            options.add_argument("--autoplay-policy=user-gesture-required")
 
         self.driver = webdriver.Chrome(options=options)
+        # Set once here rather than before every wait_for_tweet call
+        self.driver.set_script_timeout(SCRIPT_TIMEOUT)
+        if self.light_pages:
+            self.driver.execute_cdp_cmd("Network.enable", {})
+            self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+        if self._restore_session():
+            return self.driver
         self.driver.get("https://twitter.com/login")
         self._login()
+        self._save_session()
         return self.driver
 
-    def _login(self):
+    def _restore_session(self):
+        """
+        Load saved cookies into the browser and check that they still give a
+        logged-in session. Returns False if login is needed, including when
+        restoring fails for any reason.
+        """
+        try:
+            return self._restore_saved_session()
+        except Exception as e:
+            print(f"Could not restore the saved session ({str(e)}); logging in.")
+            return False
+
+    def _restore_saved_session(self):
+        cookies = self.cookie_store.load() if self.cookie_store else None
+        if not cookies:
+            # A persistent profile may still hold a logged-in session
+            if self.user_data_dir:
+                self.driver.get("https://x.com/home")
+                return self._session_valid()
+            return False
+
+        # Network.setCookies works before any page on the domain is loaded
+        self.driver.execute_cdp_cmd("Network.setCookies", {"cookies": [
+            {
+                "name": cookie["name"],
+                "value": cookie["value"],
+                "domain": cookie.get("domain"),
+                "path": cookie.get("path", "/"),
+                "secure": cookie.get("secure", False),
+                "httpOnly": cookie.get("httpOnly", False),
+                **({"expires": cookie["expiry"]} if "expiry" in cookie else {}),
+                **({"sameSite": cookie["sameSite"]} if cookie.get("sameSite") in ("Strict", "Lax", "None") else {}),
+            }
+            for cookie in cookies
+        ]})
+        self.driver.get("https://x.com/home")
+        if self._session_valid():
+            print("Restored saved session; skipping login.")
+            return True
+        print("Saved session is no longer valid; logging in.")
+        self.cookie_store.clear()
+        return False
+
+    def _session_valid(self, timeout=10):
+        """True once the home timeline renders, False if X redirects to login."""
+        try:
+            WebDriverWait(self.driver, timeout).until(
+                lambda d: "login" in d.current_url
+                or d.find_elements(By.CSS_SELECTOR, "[data-testid='SideNav_AccountSwitcher_Button']")
+            )
+        except Exception:
+            return False
+        return "login" not in self.driver.current_url and self.get_auth_token() is not None
+
+    def _save_session(self):
+        if self.cookie_store and self.get_auth_token():
+            try:
+                self.cookie_store.save(self.driver.get_cookies())
+            except OSError as e:
+                # The browser is logged in either way; the next launch just logs in again
+                print(f"Could not save session cookies: {str(e)}")
+
+    def _login(self, timeout=20):
         try:
             username_field = WebDriverWait(self.driver, 10).until(
                 EC.presence_of_element_located((By.NAME, "text"))
@@ -40,7 +137,8 @@ class WebDriverManager:
             password_field.send_keys(self.password)
             password_field.send_keys("\n")
 
-            time.sleep(5)  # Wait for login
+            # Logged in once X sets the auth_token cookie
+            WebDriverWait(self.driver, timeout).until(lambda d: self.get_auth_token() is not None)
         except Exception as e:
             print(f"Login failed: {str(e)}")
 
@@ -51,7 +149,17 @@ class WebDriverManager:
                 return cookie["value"]
         return None
 
+    def heap_usage_mb(self):
+        """Return the current page's used JS heap in MB, read through CDP."""
+        usage = self.driver.execute_cdp_cmd("Runtime.getHeapUsage", {})
+        return usage["usedSize"] / (1024 * 1024)
+
     def restart_driver(self):
+        if self.pool is not None:
+            # Take an already logged-in browser; the pool disposes of the old one
+            print("Swapping in a warm browser from the pool...")
+            self.driver, self.user_data_dir = self.pool.swap(self.driver, self.user_data_dir)
+            return
         print("Restarting WebDriver...")
         self.close()
         self.initialize_driver()